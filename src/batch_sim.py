@@ -0,0 +1,313 @@
+from src.constants import *
+from src.player import Player
+from src.rooms.room_delayed import DelayedRoom
+from src.rooms.room_momentum import MomentumRoom
+from src.rooms.room_final import FinalRoom
+
+# numpy is only needed for batch simulation, the game itself runs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Ticks a dead player waits before respawning, as in Room.respawn_player
+RESPAWN_COOLDOWN = 30
+
+class BatchSimulator:
+    # Steps N independent players through one room at once, following the
+    # same rules as Room.update + Player.update (swept AABB collision, ground
+    # probe, screen clamps, falling-out respawn, door check). State lives in
+    # numpy arrays; each tick loops over contacts and platforms, never players.
+    #
+    # The room's layout is snapshotted on creation, so call room.enter()
+    # first. Reversed and inverted-gravity rooms come from their control
+    # scheme and gravity; delayed and momentum rooms get their own input
+    # handling. The fruit and FinalRoom zones aren't simulated.
+    def __init__(self, room, count):
+        if np is None:
+            raise ImportError("BatchSimulator needs numpy: pip install numpy")
+        if isinstance(room, FinalRoom):
+            raise ValueError("FinalRoom zones can't be batch simulated")
+        self.count = count
+        player = room.player
+        self.width = player.width
+        self.height = player.height
+        self.gravity = room.gravity
+        self.jump_strength = room.jump_strength
+        self.initial_position = room.initial_position
+        platforms = room.platforms
+        self.left = np.array([p.left for p in platforms], dtype=np.float64)
+        self.top = np.array([p.top for p in platforms], dtype=np.float64)
+        self.right = np.array([p.right for p in platforms], dtype=np.float64)
+        self.bottom = np.array([p.bottom for p in platforms], dtype=np.float64)
+        self.exit_door = room.exit_door
+        self.set_control_scheme(room.control_scheme)
+
+        if isinstance(room, DelayedRoom) and room.delay_jitter:
+            raise ValueError("Jittered input delays can't be batch simulated")
+        self.delay_frames = room.delay_frames if isinstance(room, DelayedRoom) else 0
+        self.momentum_room = isinstance(room, MomentumRoom)
+        if self.momentum_room:
+            self.max_momentum = room.max_momentum
+            self.momentum_increment = room.momentum_increment
+            self.friction = room.friction
+        self.reset()
+
+    def set_control_scheme(self, control_scheme):
+        # Columns of the key arrays passed to step(), and which columns feed
+        # each action (e.g. for a RandomRoom after it reshuffles)
+        keys = []
+        for key_list in control_scheme.values():
+            for key in key_list:
+                if key not in keys:
+                    keys.append(key)
+        self.keys = tuple(keys)
+        self.action_columns = {action: [keys.index(key) for key in key_list]
+                               for action, key_list in control_scheme.items()}
+
+    def reset(self):
+        n = self.count
+        self.x = np.full(n, self.initial_position[0], dtype=np.float64)
+        self.y = np.full(n, self.initial_position[1], dtype=np.float64)
+        self.vel_x = np.zeros(n)
+        self.vel_y = np.zeros(n)
+        self.on_ground = np.zeros(n, dtype=bool)
+        self.death_cooldown = np.zeros(n, dtype=np.int32)
+        self.deaths = np.zeros(n, dtype=np.int32)
+        self.momentum = np.zeros(n)
+        # Tick each player reached the door on (-1 until then); they stop there
+        self.finished = np.full(n, -1, dtype=np.int64)
+        self.tick = 0
+        # Delayed rooms: ring buffer of the last delay_frames + 1 inputs
+        self.queue = np.zeros((self.delay_frames + 1, 3, n), dtype=bool)
+        self.queued = np.zeros(n, dtype=np.int64)
+
+    def actions_from_keys(self, pressed):
+        # pressed is an (N, len(self.keys)) bool array -> left, right, jump
+        pressed = np.asarray(pressed, dtype=bool)
+        columns = self.action_columns
+        return tuple(pressed[:, columns[action]].any(axis=1) for action in ("left", "right", "jump"))
+
+    def step(self, pressed):
+        # Advance every player one tick with the keys they hold this tick
+        self.step_actions(*self.actions_from_keys(pressed))
+
+    def step_actions(self, left, right, jump):
+        # Same as step(), with the room's control scheme already applied
+        n = self.count
+        left = np.broadcast_to(np.asarray(left, dtype=bool), (n,))
+        right = np.broadcast_to(np.asarray(right, dtype=bool), (n,))
+        jump = np.broadcast_to(np.asarray(jump, dtype=bool), (n,))
+        active = self.finished < 0
+        cooling = active & (self.death_cooldown > 0)
+        self.death_cooldown[cooling] -= 1
+        active &= ~cooling
+        dead = active & (self.y > SCREEN_HEIGHT + 50)
+        if dead.any():
+            self.x[dead] = self.initial_position[0]
+            self.y[dead] = self.initial_position[1]
+            self.vel_x[dead] = 0
+            self.vel_y[dead] = 0
+            self.death_cooldown[dead] = RESPAWN_COOLDOWN
+            self.deaths[dead] += 1
+            active &= ~dead
+        idx = np.flatnonzero(active)
+        if len(idx):
+            self.apply_input(idx, left[idx], right[idx], jump[idx])
+            self.move(idx)
+            self.check_door(idx)
+        self.tick += 1
+
+    def apply_input(self, idx, left, right, jump):
+        if self.delay_frames:
+            # Queue this tick's input and act on the one from delay_frames ago
+            size = self.delay_frames + 1
+            queued = self.queued[idx]
+            slot = queued % size
+            self.queue[slot, 0, idx] = left
+            self.queue[slot, 1, idx] = right
+            self.queue[slot, 2, idx] = jump
+            queued += 1
+            self.queued[idx] = queued
+            ready = queued > self.delay_frames
+            slot = queued % size
+            left = ready & self.queue[slot, 0, idx]
+            right = ready & self.queue[slot, 1, idx]
+            jump = ready & self.queue[slot, 2, idx]
+        if self.momentum_room:
+            momentum = self.momentum[idx]
+            going_left = left & ~right
+            going_right = right & ~left
+            coasting = ~(going_left | going_right)
+            momentum[going_left] -= self.momentum_increment
+            momentum[going_right] += self.momentum_increment
+            slowing = coasting & (momentum > 0)
+            momentum[slowing] = np.maximum(momentum[slowing] - self.friction, 0)
+            slowing = coasting & (momentum < 0)
+            momentum[slowing] = np.minimum(momentum[slowing] + self.friction, 0)
+            momentum = np.maximum(-self.max_momentum, np.minimum(momentum, self.max_momentum))
+            self.momentum[idx] = momentum
+            self.vel_x[idx] = momentum
+        else:
+            # Right wins when both are held, like Player.apply_actions
+            self.vel_x[idx] = np.where(right, PLAYER_SPEED, np.where(left, -PLAYER_SPEED, 0))
+        jumping = idx[jump & self.on_ground[idx]]
+        self.vel_y[jumping] = self.jump_strength
+        self.on_ground[jumping] = False
+
+    def move(self, idx):
+        # Player.update + Player.check_collisions for the players in idx
+        width, height = self.width, self.height
+        falls_down = self.gravity >= 0
+        x = self.x[idx]
+        y = self.y[idx]
+        vel_y = self.vel_y[idx]
+        on_ground = self.on_ground[idx]
+        vel_y[~on_ground] += self.gravity
+        dx = self.vel_x[idx].copy()
+        dy = vel_y.copy()
+        on_ground[:] = False
+        self.resolve_overlaps(x, y, vel_y, on_ground)
+
+        moving = np.flatnonzero((dx != 0) | (dy != 0))
+        for _ in range(Player.MAX_CONTACTS):
+            if not len(moving):
+                break
+            mx, my, mdx, mdy = x[moving], y[moving], dx[moving], dy[moving]
+            time, x_axis = self.sweep(mx, my, mdx, mdy)
+            mx += mdx * time
+            my += mdy * time
+            hit = time < 1.0
+            hit_x = hit & x_axis
+            hit_y = hit & ~x_axis
+            platform = self.hit_platform
+            # Snap against the wall and keep sliding vertically
+            mx[hit_x] = np.where(mdx[hit_x] > 0, self.left[platform[hit_x]] - width, self.right[platform[hit_x]])
+            mdy[hit_x] *= 1 - time[hit_x]
+            mdx[hit_x] = 0
+            # Landed if we were moving with gravity, otherwise hit our head
+            down = hit_y & (mdy > 0)
+            up = hit_y & (mdy <= 0)
+            my[down] = self.top[platform[down]] - height
+            my[up] = self.bottom[platform[up]]
+            x[moving] = mx
+            y[moving] = my
+            on_ground[moving[down if falls_down else up]] = True
+            vel_y[moving[hit_y]] = 0
+            mdx[hit_y] *= 1 - time[hit_y]
+            mdy[hit_y] = 0
+            dx[moving] = mdx
+            dy[moving] = mdy
+            still = hit & ((mdx != 0) | (mdy != 0))
+            moving = moving[still]
+
+        probe = ~on_ground & (vel_y * self.gravity >= 0)
+        on_ground[probe] = self.is_standing_on(x[probe], y[probe])
+        np.clip(x, 0, SCREEN_WIDTH - width, out=x)
+        top = y <= 0
+        y[top] = 0
+        vel_y[top] = 0
+        if not falls_down:
+            on_ground |= top
+        bottom = y >= SCREEN_HEIGHT - height
+        y[bottom] = SCREEN_HEIGHT - height
+        vel_y[bottom] = 0
+        if falls_down:
+            on_ground |= bottom
+        self.x[idx] = x
+        self.y[idx] = y
+        self.vel_y[idx] = vel_y
+        self.on_ground[idx] = on_ground
+
+    def sweep(self, x, y, dx, dy):
+        # Player.sweep against every platform at once: (time, hit on x axis)
+        # of each player's first contact, time 1.0 when there is none
+        width, height = self.width, self.height
+        n = len(x)
+        if not len(self.left):
+            self.hit_platform = np.zeros(n, dtype=np.intp)
+            return np.ones(n), np.zeros(n, dtype=bool)
+        # Only platforms touching a player's swept box (with a pixel to
+        # spare) can be hit, so the exact entry times are only worked out
+        # for those pairs instead of every player against every platform
+        reach_left = (np.minimum(x, x + dx) - 1)[:, None]
+        reach_right = (np.maximum(x, x + dx) + width + 1)[:, None]
+        reach_top = (np.minimum(y, y + dy) - 1)[:, None]
+        reach_bottom = (np.maximum(y, y + dy) + height + 1)[:, None]
+        rows, columns = np.nonzero((reach_left <= self.right) & (reach_right >= self.left)
+                                   & (reach_top <= self.bottom) & (reach_bottom >= self.top))
+        x, y, dx, dy = x[rows], y[rows], dx[rows], dy[rows]
+        left, top = self.left[columns], self.top[columns]
+        right, bottom = self.right[columns], self.bottom[columns]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_entry = np.where(dx > 0, left - (x + width), right - x) / dx
+            x_exit = np.where(dx > 0, right - x, left - (x + width)) / dx
+            y_entry = np.where(dy > 0, top - (y + height), bottom - y) / dy
+            y_exit = np.where(dy > 0, bottom - y, top - (y + height)) / dy
+        still_x = dx == 0
+        still_y = dy == 0
+        x_entry[still_x] = -np.inf
+        x_exit[still_x] = np.inf
+        y_entry[still_y] = -np.inf
+        y_exit[still_y] = np.inf
+        apart_x = still_x & ((x + width <= left) | (x >= right))
+        apart_y = still_y & ((y + height <= top) | (y >= bottom))
+        entry = np.maximum(x_entry, y_entry)
+        hits = (~apart_x & ~apart_y & (entry < np.minimum(x_exit, y_exit))
+                & (entry >= 0) & (entry < 1.0))
+        # Each player's earliest hit, the first platform winning ties like
+        # the strict < in check_collisions (pairs are in platform order)
+        rows, columns, entry = rows[hits], columns[hits], entry[hits]
+        on_x_axis = x_entry[hits] > y_entry[hits]
+        order = np.lexsort((entry, rows))
+        first = order[np.diff(rows[order], prepend=-1) != 0]
+        rows = rows[first]
+        time = np.ones(n)
+        time[rows] = entry[first]
+        x_axis = np.zeros(n, dtype=bool)
+        x_axis[rows] = on_x_axis[first]
+        self.hit_platform = np.zeros(n, dtype=np.intp)
+        self.hit_platform[rows] = columns[first]
+        return time, x_axis
+
+    def resolve_overlaps(self, x, y, vel_y, on_ground):
+        # Player.resolve_overlaps, platform by platform in order
+        width, height = self.width, self.height
+        for left, top, right, bottom in zip(self.left, self.top, self.right, self.bottom):
+            inside = ~((x + width <= left) | (x >= right) | (y + height <= top) | (y >= bottom))
+            if not inside.any():
+                continue
+            up = y + height - top
+            down = bottom - y
+            push_left = x + width - left
+            push_right = right - x
+            shortest = np.minimum(np.minimum(up, down), np.minimum(push_left, push_right))
+            is_up = inside & (shortest == up)
+            is_down = inside & ~is_up & (shortest == down)
+            is_left = inside & ~is_up & ~is_down & (shortest == push_left)
+            is_right = inside & ~is_up & ~is_down & ~is_left
+            y[is_up] = top - height
+            vel_y[is_up] = np.minimum(vel_y[is_up], 0)
+            y[is_down] = bottom
+            vel_y[is_down] = np.maximum(vel_y[is_down], 0)
+            on_ground |= is_up if self.gravity >= 0 else is_down
+            x[is_left] = left - width
+            x[is_right] = right
+
+    def is_standing_on(self, x, y):
+        x, y = x[:, None], y[:, None]
+        across = (x + self.width > self.left) & (x < self.right)
+        if self.gravity >= 0:
+            touching = y + self.height == self.top
+        else:
+            touching = y == self.bottom
+        return (across & touching).any(axis=1)
+
+    def check_door(self, idx):
+        # Same overlap test as colliderect on the truncated player rect
+        door = self.exit_door
+        x = np.trunc(self.x[idx])
+        y = np.trunc(self.y[idx])
+        inside = ((x < door.right) & (x + self.width > door.left)
+                  & (y < door.bottom) & (y + self.height > door.top))
+        self.finished[idx[inside]] = self.tick
@@ -1,12 +1,30 @@
-# Screen dimensions
+# Screen dimensions. This is also the fixed logical size of the framebuffer
+# the game draws into; all layout is in these coordinates.
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 
+# Window is a whole multiple of the framebuffer (or a fraction, when smaller);
+# fullscreen picks the largest multiple that fits and adds black borders.
+# Filter is "nearest" or "scale2x". WINDOW_SCALE = 1 skips the scaling pass
+WINDOW_SCALE = 1
+FULLSCREEN = False
+UPSCALE_FILTER = "nearest"
+
 # Game settings
-FPS = 60
+FPS = 60  # Simulation ticks per second, all physics constants are per tick
+# Presentation runs independently of the simulation (0 = uncapped)
+MAX_RENDER_FPS = 144
+# Most ticks simulated for one rendered frame before the game slows down
+MAX_TICKS_PER_FRAME = 5
 GRAVITY = 0.8
 PLAYER_SPEED = 5
 JUMP_STRENGTH = -12
+# What a control scheme turns the held keys into, one bit per action
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_JUMP = 4
+# Longest input delay (plus jitter) DelayedRoom can be set to, in ticks
+MAX_INPUT_DELAY = 5 * FPS
 
 # Colors (RGB values)
 BLACK = (0, 0, 0)
@@ -21,6 +39,40 @@ YELLOW_PASTEL = (255, 255, 204)
 GREEN_PASTEL = (204, 255, 204)
 PURPLE_PASTEL = (221, 160, 221)
 
+# Present only the regions that changed instead of flipping the whole screen
+DIRTY_RECT_RENDERING = False
+
+# Effect between rooms ("crossfade", "wipe" or "none") and its length in frames
+ROOM_TRANSITION_EFFECT = "crossfade"
+ROOM_TRANSITION_FRAMES = 20
+
+# Record play sessions (from the level select on) into REPLAY_DIR, with a
+# state hash every REPLAY_HASH_INTERVAL ticks to catch desyncs on playback
+RECORD_REPLAYS = False
+REPLAY_DIR = "replays"
+REPLAY_EXTENSION = ".csreplay"
+REPLAY_HASH_INTERVAL = 120
+
+# Hold R to rewind the current room, up to REWIND_SECONDS back. Snapshots
+# are stored as deltas against a keyframe every REWIND_KEYFRAME_INTERVAL ticks
+REWIND_ENABLED = True
+REWIND_SECONDS = 10
+REWIND_KEYFRAME_INTERVAL = 30
+
+# F5 quick-saves and F9 quick-loads the whole game, and a crash writes a
+# savestate before the error is raised
+QUICKSAVE_PATH = "quicksave.cssave"
+CRASH_SAVE_PATH = "crash.cssave"
+
+# Measure key event -> simulated -> presented latency (F3 turns it on and
+# shows the overlay). Histograms use LATENCY_BUCKETS buckets of
+# LATENCY_BUCKET_MS, and each session's samples go to a CSV in LATENCY_DIR
+LATENCY_PROBE = False
+LATENCY_OVERLAY = False
+LATENCY_DIR = "latency"
+LATENCY_BUCKET_MS = 0.5
+LATENCY_BUCKETS = 400
+
 # Tile size
 TILE_SIZE = 32
 
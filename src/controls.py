@@ -0,0 +1,46 @@
+from src.constants import *
+from src.input import KEY_BITS
+
+ACTION_BITS = {"left": ACTION_LEFT, "right": ACTION_RIGHT, "jump": ACTION_JUMP}
+
+class ControlScheme:
+    # A control scheme ({"left": [keys], "right": ..., "jump": ...}) compiled
+    # into two 256-entry tables from each byte of a KeyState mask to the
+    # actions it triggers, so resolving input is two lookups and an or.
+    # Compiled schemes are shared, get them with ControlScheme.compile().
+    __slots__ = ("scheme", "low", "high")
+    compiled = {}
+
+    def __init__(self, scheme):
+        self.scheme = {action: tuple(key_list) for action, key_list in scheme.items()}
+        # Actions triggered by each bit of the key mask
+        bit_actions = [0] * 16
+        for action, key_list in self.scheme.items():
+            for key in key_list:
+                if key not in KEY_BITS:
+                    raise ValueError(f"{action} key {key} isn't tracked by KeyState")
+                bit_actions[KEY_BITS[key].bit_length() - 1] |= ACTION_BITS[action]
+        self.low = self.build_table(bit_actions[:8])
+        self.high = self.build_table(bit_actions[8:])
+
+    @staticmethod
+    def build_table(bit_actions):
+        table = bytearray(256)
+        for byte in range(1, 256):
+            # Every byte is a smaller byte plus its highest bit
+            top = byte.bit_length() - 1
+            table[byte] = table[byte & ~(1 << top)] | bit_actions[top]
+        return bytes(table)
+
+    @classmethod
+    def compile(cls, scheme):
+        key = tuple((action, tuple(key_list)) for action, key_list in scheme.items())
+        compiled = cls.compiled.get(key)
+        if compiled is None:
+            compiled = cls.compiled[key] = cls(scheme)
+        return compiled
+
+    def actions(self, keys):
+        # Action bits for a KeyState
+        mask = keys.mask
+        return self.low[mask & 0xFF] | self.high[mask >> 8]
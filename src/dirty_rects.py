@@ -0,0 +1,48 @@
+import pygame
+
+class DirtyRects:
+    # Collects the framebuffer regions touched by moving things so a frame can
+    # be presented with pygame.display.update(rects) instead of a full flip
+    def __init__(self):
+        self.enabled = False
+        self.full_redraw = True
+        # Regions drawn last frame and this frame, keyed by whoever drew them
+        self.previous = {}
+        self.current = {}
+
+    def mark(self, key, rect):
+        # Report the bounds something was drawn at this frame
+        if self.enabled:
+            self.current[key] = pygame.Rect(rect)
+
+    def invalidate(self):
+        # Something outside the tracked regions changed, present the whole frame
+        self.full_redraw = True
+
+    def get_rects(self):
+        # Old and new bounds of everything that moved, appeared or disappeared
+        rects = []
+        for key, rect in self.current.items():
+            old = self.previous.get(key)
+            if old is None:
+                rects.append(rect)
+            else:
+                rects.append(rect.union(old))
+        for key, old in self.previous.items():
+            if key not in self.current:
+                rects.append(old)
+        return rects
+
+    def take_rects(self):
+        # Regions to present this frame, or None when the whole frame is needed
+        if not self.enabled or self.full_redraw:
+            rects = None
+            self.full_redraw = False
+        else:
+            rects = self.get_rects()
+        self.previous, self.current = self.current, self.previous
+        self.current.clear()
+        return rects
+
+# Shared tracker used by the game and every room
+dirty_rects = DirtyRects()
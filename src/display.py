@@ -0,0 +1,101 @@
+import pygame
+from src.constants import *
+
+class Display:
+    # Owns the window and the SCREEN_WIDTH x SCREEN_HEIGHT framebuffer the game
+    # draws into. The framebuffer is upscaled by a whole number to fit the
+    # window, with black borders around it, so pixels stay sharp at any window
+    # or monitor size. Windows smaller than the framebuffer get it scaled down
+    # to fit instead. This doesn't make drawing any cheaper: a window that
+    # isn't exactly the framebuffer's size costs one full-window scale per
+    # presented frame, and only a matching window draws straight into it.
+    def __init__(self, window_scale=WINDOW_SCALE, fullscreen=FULLSCREEN, upscale_filter=UPSCALE_FILTER):
+        self.window_scale = window_scale
+        self.fullscreen = fullscreen
+        self.upscale_filter = upscale_filter
+        self.window = None
+        self.framebuffer = None
+        self.scale = 1
+        self.view_rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.view = None
+        self.scale2x_steps = []
+        self.open_window()
+
+    def open_window(self):
+        if self.fullscreen:
+            self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            size = (SCREEN_WIDTH * self.window_scale, SCREEN_HEIGHT * self.window_scale)
+            self.window = pygame.display.set_mode(size, pygame.RESIZABLE)
+        self.configure()
+
+    def configure(self):
+        # Work out the largest whole-number scale that fits the window, or
+        # the fraction that fits a smaller one
+        window_width, window_height = self.window.get_size()
+        fit = min(window_width / SCREEN_WIDTH, window_height / SCREEN_HEIGHT)
+        self.scale = int(fit) if fit >= 1 else fit
+        width = max(1, min(window_width, int(SCREEN_WIDTH * self.scale)))
+        height = max(1, min(window_height, int(SCREEN_HEIGHT * self.scale)))
+        self.view_rect = pygame.Rect((window_width - width) // 2, (window_height - height) // 2, width, height)
+        self.window.fill(BLACK)
+        if not window_width or not window_height:
+            # Minimized, nothing can be shown until the next resize
+            if self.framebuffer is None or self.framebuffer is self.window:
+                self.framebuffer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.view = None
+            self.scale2x_steps = []
+            return
+        if self.scale == 1 and self.view_rect.topleft == (0, 0):
+            # Window matches the framebuffer, draw straight into it
+            self.framebuffer = self.window
+            self.view = None
+            self.scale2x_steps = []
+            return
+        if self.framebuffer is None or self.framebuffer is self.window:
+            self.framebuffer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.view = self.window.subsurface(self.view_rect)
+        # scale2x only doubles, so it is used when the scale is a power of two
+        self.scale2x_steps = []
+        if self.upscale_filter == "scale2x" and self.scale > 1 and self.scale & (self.scale - 1) == 0:
+            factor = 2
+            while factor < self.scale:
+                self.scale2x_steps.append(pygame.Surface((SCREEN_WIDTH * factor, SCREEN_HEIGHT * factor)).convert())
+                factor *= 2
+            self.scale2x_steps.append(self.view)
+
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        self.open_window()
+
+    def resize(self, size):
+        if not self.fullscreen:
+            self.window = pygame.display.set_mode(size, pygame.RESIZABLE)
+            self.configure()
+
+    def upscale(self):
+        # Scale the framebuffer into the window without allocating
+        if self.view is None:
+            return
+        if self.scale2x_steps:
+            source = self.framebuffer
+            for target in self.scale2x_steps:
+                pygame.transform.scale2x(source, target)
+                source = target
+        else:
+            pygame.transform.scale(self.framebuffer, self.view_rect.size, self.view)
+
+    def present(self, rects=None):
+        # rects are in framebuffer coordinates, None presents the whole frame
+        self.upscale()
+        if rects is None or self.scale < 1:
+            # Dirty rects don't map onto a scaled-down view, show it all
+            pygame.display.flip()
+        elif self.view is None:
+            pygame.display.update(rects)
+        else:
+            pygame.display.update([self.to_window(rect) for rect in rects])
+
+    def to_window(self, rect):
+        return pygame.Rect(self.view_rect.x + rect.x * self.scale, self.view_rect.y + rect.y * self.scale,
+                           rect.width * self.scale, rect.height * self.scale)
@@ -0,0 +1,45 @@
+import pygame
+from collections import OrderedDict
+
+# Memory cap for cached text surfaces (bytes)
+TEXT_CACHE_LIMIT = 4 * 1024 * 1024
+
+# Loaded fonts, keyed by size
+_fonts = {}
+
+# Rendered text surfaces, keyed by (text, size, color, antialias), oldest first
+_text_cache = OrderedDict()
+_text_cache_bytes = 0
+
+def get_font(size):
+    # Load the default font once per size
+    font = _fonts.get(size)
+    if font is None:
+        font = pygame.font.Font(None, size)
+        _fonts[size] = font
+    return font
+
+def render_text(text, size, color, antialias=True):
+    # Return a cached rendering of the text, rendering it only on a cache miss
+    global _text_cache_bytes
+    key = (text, size, tuple(color), antialias)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+    surface = get_font(size).render(text, antialias, color)
+    _text_cache[key] = surface
+    _text_cache_bytes += _surface_bytes(surface)
+    # Evict the least recently used entries once we go over the cap
+    while _text_cache_bytes > TEXT_CACHE_LIMIT and len(_text_cache) > 1:
+        _, evicted = _text_cache.popitem(last=False)
+        _text_cache_bytes -= _surface_bytes(evicted)
+    return surface
+
+def clear_text_cache():
+    global _text_cache_bytes
+    _text_cache.clear()
+    _text_cache_bytes = 0
+
+def _surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
@@ -1,11 +1,23 @@
 import pygame
 import asyncio
+import struct
 from src.constants import *
+from src.fonts import get_font, render_text
+from src.dirty_rects import dirty_rects
+from src.display import Display
+from src.transitions import Fade, create_room_transition
+from src.input import KeyState, KeyboardInput, InputTracker, NO_KEYS
+from src.replay import Recorder
+from src.rewind import RewindBuffer
+from src.latency import LatencyProbe
+from src import savestate
+from src.savestate import pack_string, unpack_string, pack_rng, unpack_rng
 from src.player import Player
 from src.rooms.room_manager import RoomManager
 import os
 import sys
 import random
+import time
 
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -18,7 +30,8 @@ def get_resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class MusicManager:
-    def __init__(self):
+    def __init__(self, enabled=True):
+        self.enabled = enabled
         self.music_files = [
             get_resource_path('assets/music/room1.ogg'),
             get_resource_path('assets/music/room2.ogg'),
@@ -31,6 +44,8 @@ class MusicManager:
         self.current_index = -1
 
     def play(self, index):
+        if not self.enabled:
+            return
         if index != self.current_index and 0 <= index < len(self.music_files):
             music_file = self.music_files[index]
             print(f"Trying to play: {music_file}")  # Debug output
@@ -50,41 +65,82 @@ class MusicManager:
                 self.current_index = -1
 
     def stop(self):
-        pygame.mixer.music.stop()
+        if self.enabled:
+            pygame.mixer.music.stop()
         self.current_index = -1
 
 class Narrator:
+    # Glitch offsets cycle through a fixed table instead of rolling the global RNG
+    GLITCH_OFFSETS = (-2, -1, 0, 1, 2)
+    GLITCH_TABLE_SIZE = 64
+    # Savestate: active, counter, glitch index, then the message
+    SAVE_STATE = struct.Struct("<?HB")
+
     def __init__(self):
-        self.font = pygame.font.Font(None, 32)
         self.messages = []
         self.active = False
         self.counter = 0
         self.max_counter = 120
         self.current_message = ""
+        self.box_rect = pygame.Rect(100, 100, SCREEN_WIDTH-200, 100)
+        # One pre-rendered box per glitch offset, rebuilt when the message
+        # changes, and the message they show
+        self.frames = []
+        self.rendered_message = None
+        rng = random.Random(0)
+        self.glitch_table = [rng.randrange(len(self.GLITCH_OFFSETS)) for _ in range(self.GLITCH_TABLE_SIZE)]
+        self.glitch_index = 0
 
     def show_message(self, message):
         self.current_message = message
         self.active = True
         self.counter = 0
+        self.render_frames()
+
+    def render_frames(self):
+        # Draw a glitchy text box, one line of text per line of the message
+        lines = [render_text(line, 32, (255,255,255)) for line in self.current_message.split("\n")]
+        line_height = get_font(32).get_linesize()
+        self.box_rect.height = 100 + (len(lines) - 1) * line_height
+        if not self.frames or self.frames[0].get_size() != self.box_rect.size:
+            self.frames = [pygame.Surface(self.box_rect.size).convert() for _ in self.GLITCH_OFFSETS]
+        for frame, offset in zip(self.frames, self.GLITCH_OFFSETS):
+            frame.fill((30,0,30))
+            pygame.draw.rect(frame, PINK_PASTEL, frame.get_rect(), 3)
+            for i, text in enumerate(lines):
+                frame.blit(text, (20+offset, 30+offset + i * line_height))
+        self.rendered_message = self.current_message
+
+    def pack_save_state(self):
+        return (self.SAVE_STATE.pack(self.active, self.counter, self.glitch_index)
+                + pack_string(self.current_message))
+
+    def unpack_save_state(self, data, offset=0):
+        self.active, self.counter, self.glitch_index = self.SAVE_STATE.unpack_from(data, offset)
+        # The box is rendered again on the next draw if the message changed
+        self.current_message, offset = unpack_string(data, offset + self.SAVE_STATE.size)
+        return offset
 
     def update(self):
         if self.active:
+            # Glitch effect steps once per tick
+            self.glitch_index = (self.glitch_index + 1) % self.GLITCH_TABLE_SIZE
             self.counter += 1
             if self.counter > self.max_counter:
                 self.active = False
 
     def draw(self, screen):
         if self.active:
-            # Draw a glitchy text box
-            box_rect = pygame.Rect(100, 100, SCREEN_WIDTH-200, 100)
-            pygame.draw.rect(screen, (30,0,30), box_rect)
-            pygame.draw.rect(screen, PINK_PASTEL, box_rect, 3)
-            # Glitch effect
-            offset = random.randint(-2,2)
-            text = self.font.render(self.current_message, True, (255,255,255))
-            screen.blit(text, (box_rect.x+20+offset, box_rect.y+30+offset))
+            if self.rendered_message != self.current_message:
+                self.render_frames()
+            frame = self.frames[self.glitch_table[self.glitch_index]]
+            dirty_rects.mark("narrator", screen.blit(frame, self.box_rect.topleft))
 
 class EndingSequence:
+    STATES = ("dialogue", "fade", "choice", "game_over")
+    # Savestate: state, dialogue line and timer, fade timer, choice flags
+    SAVE_STATE = struct.Struct("<BHHHB???")
+
     def __init__(self):
         self.state = "dialogue"
         self.dialogues = [
@@ -98,11 +154,23 @@ class EndingSequence:
         self.done = False
         self.fade_timer = 0
         self.fade_duration = FPS  # 1 second fade
+        self.fade = Fade(self.fade_duration)
         self.choice_options = ["get revenge", "forgive him"]
         self.selected_option = 0
         self.choice_active = False
         self.choice_made = False
 
+    def pack_save_state(self):
+        return self.SAVE_STATE.pack(self.STATES.index(self.state), self.dialogue_index,
+                                    self.dialogue_timer, self.fade_timer, self.selected_option,
+                                    self.choice_active, self.choice_made, self.done)
+
+    def unpack_save_state(self, data, offset=0):
+        (state, self.dialogue_index, self.dialogue_timer, self.fade_timer, self.selected_option,
+         self.choice_active, self.choice_made, self.done) = self.SAVE_STATE.unpack_from(data, offset)
+        self.state = self.STATES[state]
+        return offset + self.SAVE_STATE.size
+
     def update(self, keys, player):
         if self.state == "dialogue":
             self.dialogue_timer += 1
@@ -148,78 +216,151 @@ class EndingSequence:
             pygame.draw.rect(screen, PINK_PASTEL, (400, 240, 20, 40))
             pygame.draw.circle(screen, YELLOW_PASTEL, (410, 230), 10)
             if self.dialogue_index < len(self.dialogues):
-                font = pygame.font.Font(None, 40)
-                text = font.render(self.dialogues[self.dialogue_index], True, WHITE)
+                text = render_text(self.dialogues[self.dialogue_index], 40, WHITE)
                 screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 350))
         elif self.state == "fade":
             # Fade to black
-            fade_alpha = int(255 * (self.fade_timer / self.fade_duration))
-            fade_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            fade_surface.fill((0, 0, 0))
-            fade_surface.set_alpha(fade_alpha)
-            screen.blit(fade_surface, (0, 0))
+            self.fade.render(screen, self.fade_timer / self.fade_duration)
         elif self.state == "choice":
             screen.fill((0, 0, 0))
-            font = pygame.font.Font(None, 48)
             for i, option in enumerate(self.choice_options):
                 if i == self.selected_option:
                     color = PINK_PASTEL
                 else:
                     color = GRAY
-                text = font.render(f"[{option}]", True, color)
+                text = render_text(f"[{option}]", 48, color)
                 x = SCREEN_WIDTH // 2 - 200 + i * 400 - text.get_width() // 2
                 y = SCREEN_HEIGHT // 2 - text.get_height() // 2
                 screen.blit(text, (x, y))
         elif self.state == "game_over":
             screen.fill((20, 0, 20))
-            font = pygame.font.Font(None, 64)
-            text = font.render("GAME OVER (for him)", True, RED)
+            text = render_text("GAME OVER (for him)", 64, RED)
             screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, SCREEN_HEIGHT // 2 - text.get_height() // 2))
 
 class Game:
-    def __init__(self):
-        # Set up the display
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    # Savestate header: seed, tick, room, background seed, transition counter,
+    # last keys and which title screen is up
+    SAVE_STATE = struct.Struct("<IQBIIH??")
+    # Keys handled by the game itself, never seen by the simulation
+    META_KEYS = (pygame.K_F3, pygame.K_F5, pygame.K_F9, pygame.K_F11)
+
+    def __init__(self, headless=False, input_source=None, seed=None):
+        # Headless games use SDL's dummy drivers, skip the title screens and
+        # music, and only draw when draw() is called. They are driven with
+        # step() instead of run().
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+            # The drivers are only picked on init, so restart whatever is
+            # already running on a real one
+            if pygame.display.get_init() and pygame.display.get_driver() != "dummy":
+                pygame.display.quit()
+            if pygame.mixer.get_init():
+                pygame.mixer.quit()
+            pygame.init()
+        # Where tick() gets its keys from
+        self.input_source = input_source if input_source is not None else InputTracker()
+        self.last_keys = NO_KEYS
+        # Everything random in the simulation is drawn from this seed
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng = random.Random(self.seed)
+        self.tick_count = 0
+        # Called as hook(game, keys) after every tick (recording, checks)
+        self.tick_hooks = []
+        # Called as hook(game) after every presented frame
+        self.present_hooks = []
+        self.recorder = None
+        self.latency_probe = None
+        if LATENCY_PROBE:
+            self.enable_latency_probe()
+
+        # Set up the display, everything is drawn into its framebuffer
+        self.display = Display()
+        self.screen = self.display.framebuffer
         pygame.display.set_caption("Control Shift")
         
-        # Set up the clock
+        # Set up the clock, the simulation runs in fixed ticks of tick_duration
         self.clock = pygame.time.Clock()
+        self.tick_duration = 1.0 / FPS
+        self.accumulator = 0.0
+        self.last_time = None
         
         # Set up game objects
         self.player = Player()
-        self.room_manager = RoomManager(self.player)
+        self.room_manager = RoomManager(self.player, self.rng.getrandbits(32))
         
         # Game state
         self.running = True
         
-        # Font for displaying messages
-        self.font = pygame.font.Font(None, 24)
-        self.large_font = pygame.font.Font(None, 48)
-        
         # Game state
         self.game_state = "PLAYING"  # PLAYING, TRANSITION, ENDING_SEQUENCE, CREDITS, LEVEL_SELECT
         self.transition_counter = 0
         self.transition_message = ""
+        # Transition screen is rendered once per transition message, and the
+        # effect between rooms reuses the same surfaces every time
+        self.transition_screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.transition_screen_message = None
+        self.room_transition = create_room_transition()
         
         # Load game title screen
-        self.title_screen = True
+        self.title_screen = not headless
         self.level_select_screen = False
         
         # Music manager
-        self.music_manager = MusicManager()
+        self.music_manager = MusicManager(enabled=not headless)
         self.narrator = Narrator()
         self.current_room_index = 0
         self.background_seed = 0
-        pygame.mixer.init()
+        # Cached background pattern and the (room_index, background_seed) it was made for
+        self.background = None
+        self.background_key = None
+        # Dirty-rect presentation, and what was on screen last time we presented
+        dirty_rects.enabled = DIRTY_RECT_RENDERING
+        self.last_scene = None
+        if not headless:
+            pygame.mixer.init()
         self.music_manager.play(self.current_room_index)
         
         self.ending_sequence = None
+        # Recent snapshots of the current room for rewinding
+        self.rewind = RewindBuffer()
         
     def handle_events(self):
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        # The tracker sees every event, even ones the screens below stop at,
+        # except the meta keys (otherwise quick-saving would also count as
+        # "press any key" and end up in replays)
+        if isinstance(self.input_source, InputTracker):
+            for event in events:
+                if event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key in self.META_KEYS:
+                    continue
+                self.input_source.handle_event(event)
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
             
+            # Window size changes only affect how the framebuffer is scaled
+            if event.type == pygame.VIDEORESIZE:
+                self.display.resize(event.size)
+                self.screen = self.display.framebuffer
+                dirty_rects.invalidate()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
+                self.display.toggle_fullscreen()
+                self.screen = self.display.framebuffer
+                dirty_rects.invalidate()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_latency_overlay()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                self.quick_save()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                self.quick_load()
+                continue
+            
             # Handle title screen input
             if self.title_screen and event.type == pygame.KEYDOWN:
                 self.title_screen = False
@@ -230,68 +371,179 @@ class Game:
             if self.level_select_screen and event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     # Start from beginning
-                    self.level_select_screen = False
-                    self.game_state = "PLAYING"
+                    self.start_room(0)
                 elif event.key >= pygame.K_1 and event.key <= pygame.K_7:
                     # Jump to specific level
-                    level_num = event.key - pygame.K_1
-                    self.level_select_screen = False
-                    self.game_state = "PLAYING"
-                    self.room_manager.current_room_index = level_num
-                    self.room_manager.current_room = self.room_manager.rooms[level_num]
-                    self.room_manager.current_room.enter()
-                    self.current_room_index = level_num
-                    self.music_manager.play(self.current_room_index)
-                return
-                
-            # In transition state, wait for any key to continue
-            if self.game_state == "TRANSITION" and event.type == pygame.KEYDOWN:
-                self.game_state = "PLAYING"
-                self.narrator.active = False
+                    self.start_room(event.key - pygame.K_1)
                 return
                 
             # Let the current room handle the input if we're playing
             if self.game_state == "PLAYING":
                 self.room_manager.handle_event(event)
-            elif self.game_state == "ENDING_SEQUENCE":
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                    if self.ending_sequence:
-                        keys = pygame.key.get_pressed()
-                        self.ending_sequence.update(keys, self.player)
     
-    def update(self):
-        if self.title_screen or self.level_select_screen or self.game_state == "TRANSITION":
+    def start_room(self, level_num):
+        # Start playing from the given room
+        self.title_screen = False
+        self.level_select_screen = False
+        self.game_state = "PLAYING"
+        self.room_manager.current_room_index = level_num
+        self.room_manager.current_room = self.room_manager.rooms[level_num]
+        self.room_manager.current_room.enter()
+        self.rewind.clear()
+        self.current_room_index = level_num
+        self.music_manager.play(self.current_room_index)
+        # Only live keyboard play is worth recording
+        if RECORD_REPLAYS and isinstance(self.input_source, (InputTracker, KeyboardInput)):
+            self.start_recording(level_num)
+    
+    def start_recording(self, level_num):
+        # Record every tick from here on, saved when the game quits
+        self.stop_recording()
+        self.recorder = Recorder(self.seed, level_num)
+        self.tick_hooks.append(self.recorder.record)
+    
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.tick_hooks.remove(self.recorder.record)
+        if self.recorder.tick_count:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            path = os.path.join(REPLAY_DIR, time.strftime("%Y%m%d-%H%M%S") + REPLAY_EXTENSION)
+            self.recorder.save(path)
+            print(f"Saved replay: {path}")
+        self.recorder = None
+    
+    def enable_latency_probe(self):
+        if self.latency_probe is None:
+            self.latency_probe = LatencyProbe()
+            self.latency_probe.attach(self)
+    
+    def toggle_latency_overlay(self):
+        self.enable_latency_probe()
+        self.latency_probe.overlay = not self.latency_probe.overlay
+        dirty_rects.invalidate()
+    
+    def pack_save_state(self):
+        data = [self.SAVE_STATE.pack(self.seed, self.tick_count, self.current_room_index,
+                                     self.background_seed, self.transition_counter,
+                                     self.last_keys.mask, self.title_screen, self.level_select_screen),
+                pack_string(self.game_state), pack_string(self.transition_message),
+                pack_rng(self.rng), self.narrator.pack_save_state(),
+                struct.pack("<?", self.ending_sequence is not None)]
+        if self.ending_sequence is not None:
+            data.append(self.ending_sequence.pack_save_state())
+        data.append(self.room_manager.pack_save_state())
+        return b"".join(data)
+
+    def unpack_save_state(self, data, offset=0):
+        # A recording can't continue across a jump in time
+        self.stop_recording()
+        (self.seed, self.tick_count, self.current_room_index, self.background_seed,
+         self.transition_counter, last_keys, self.title_screen,
+         self.level_select_screen) = self.SAVE_STATE.unpack_from(data, offset)
+        self.last_keys = KeyState(last_keys)
+        self.game_state, offset = unpack_string(data, offset + self.SAVE_STATE.size)
+        self.transition_message, offset = unpack_string(data, offset)
+        offset = unpack_rng(self.rng, data, offset)
+        offset = self.narrator.unpack_save_state(data, offset)
+        has_ending, = struct.unpack_from("<?", data, offset)
+        offset += 1
+        if has_ending:
+            # Every field comes from the savestate, so a running one is reused
+            if self.ending_sequence is None:
+                self.ending_sequence = EndingSequence()
+            offset = self.ending_sequence.unpack_save_state(data, offset)
+        else:
+            self.ending_sequence = None
+        offset = self.room_manager.unpack_save_state(data, offset)
+        self.rewind.clear()
+        self.music_manager.play(self.current_room_index)
+        dirty_rects.invalidate()
+        return offset
+
+    def quick_save(self):
+        # QUICKSAVE_PATH is relative to the working directory, which may
+        # not be writable
+        try:
+            savestate.save(self, QUICKSAVE_PATH)
+            print(f"Saved: {QUICKSAVE_PATH}")
+        except OSError as e:
+            print(f"❌ Failed to save {QUICKSAVE_PATH}: {e}")
+
+    def quick_load(self):
+        if not os.path.exists(QUICKSAVE_PATH):
+            return
+        try:
+            savestate.load(self, QUICKSAVE_PATH)
+            print(f"Loaded: {QUICKSAVE_PATH}")
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed to load {QUICKSAVE_PATH}: {e}")
+
+    def save_crash_state(self):
+        # Best effort, the original error is what matters
+        try:
+            savestate.save(self, CRASH_SAVE_PATH)
+            print(f"Saved crash state: {CRASH_SAVE_PATH}")
+        except Exception as e:
+            print(f"❌ Failed to save crash state: {e}")
+
+    def update(self, keys):
+        # keys is this tick's KeyState, the simulation never reads the keyboard
+        self.room_transition.update()
+        if self.title_screen or self.level_select_screen:
+            self.narrator.update()
+            return
+        if self.game_state == "TRANSITION":
+            self.transition_counter += 1
             self.narrator.update()
+            # Wait for any key to be pressed to continue
+            if keys.pressed_since(self.last_keys):
+                self.room_transition.capture(self.screen)
+                self.game_state = "PLAYING"
+                self.narrator.active = False
             return
         if self.game_state == "ENDING_SEQUENCE":
             if self.ending_sequence:
-                keys = pygame.key.get_pressed()
                 still_running = self.ending_sequence.update(keys, self.player)
                 if not still_running:
                     # Check if forgiveness was chosen
                     if hasattr(self.ending_sequence, 'state') and self.ending_sequence.state == 'choice' and self.ending_sequence.selected_option == 1:
                         self.room_manager.reset_first_room_no_door()
+                        self.rewind.clear()
                         self.game_state = "PLAYING"
                         self.ending_sequence = None
                     else:
                         self.game_state = "CREDITS"
             return
             
+        # Holding R runs the room backwards instead
+        if REWIND_ENABLED and keys[pygame.K_r]:
+            snapshot = self.rewind.step_back()
+            if snapshot is not None:
+                self.room_manager.unpack_sim_state(snapshot)
+            return
+        
         # Update the current room
-        room_completed, message = self.room_manager.update()
+        room_completed, message = self.room_manager.update(keys)
         
         # Handle room transition if the current room is completed
         if room_completed:
             self.transition_to_next_room(message)
+        elif REWIND_ENABLED:
+            self.rewind.push(self.room_manager.pack_sim_state())
     
     def transition_to_next_room(self, message):
+        # Fade out of the room as it was last drawn
+        self.room_transition.capture(self.screen)
         self.game_state = "TRANSITION"
         self.transition_counter = 0
         self.transition_message = message
+        self.render_transition_screen()
         self.room_manager.next_room()
+        self.rewind.clear()
         self.current_room_index = self.room_manager.current_room_index
         self.music_manager.play(self.current_room_index)
-        self.background_seed = random.randint(0,10000)
+        self.background_seed = self.rng.randint(0,10000)
         evil_lines = [
             "Did you like that? Let's make it harder...",
             "You thought you had control? Think again!",
@@ -301,13 +553,12 @@ class Game:
             "I can do this all day...",
             "This is my world now!"
         ]
-        self.narrator.show_message(random.choice(evil_lines))
+        self.narrator.show_message(self.rng.choice(evil_lines))
         if self.current_room_index == 0:  # Completed all rooms
             self.game_state = "ENDING_SEQUENCE"
             self.ending_sequence = EndingSequence()
     
     def draw(self):
-        self.draw_background(self.current_room_index)
         # Clear the screen
         self.screen.fill(BLACK)
         
@@ -323,54 +574,84 @@ class Game:
                 self.ending_sequence.draw(self.screen, self.player)
         elif self.game_state == "CREDITS":
             self.screen.fill(BLACK)
-            font = pygame.font.Font(None, 48)
-            text1 = font.render("GAME OVER (for him)", True, RED)
-            text2 = font.render("Congratulations!", True, GREEN)
-            text3 = font.render("Thanks for playing Control Shift!", True, WHITE)
+            text1 = render_text("GAME OVER (for him)", 48, RED)
+            text2 = render_text("Congratulations!", 48, GREEN)
+            text3 = render_text("Thanks for playing Control Shift!", 48, WHITE)
             self.screen.blit(text1, (SCREEN_WIDTH // 2 - text1.get_width() // 2, SCREEN_HEIGHT // 2 - 80))
             self.screen.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2, SCREEN_HEIGHT // 2 - 30))
             self.screen.blit(text3, (SCREEN_WIDTH // 2 - text3.get_width() // 2, SCREEN_HEIGHT // 2 + 20))
         else:
-            # Draw the current room
+            # Draw the current room on top of its background pattern
+            self.room_manager.set_backdrop(self.get_background(self.current_room_index))
             self.room_manager.draw(self.screen)
             
             # Draw UI elements like hints
             control_hint = self.room_manager.get_control_hint()
             if control_hint:
-                hint_text = self.font.render(control_hint, True, WHITE)
-                self.screen.blit(hint_text, (10, SCREEN_HEIGHT - 30))
+                hint_text = render_text(control_hint, 24, WHITE)
+                dirty_rects.mark("hint", self.screen.blit(hint_text, (10, SCREEN_HEIGHT - 30)))
+        
+        # Fade out of the previous screen on top of everything
+        self.room_transition.draw(self.screen)
+        
+        if self.latency_probe is not None and self.latency_probe.overlay:
+            self.latency_probe.draw(self.screen)
         
         # Update the display
-        pygame.display.flip()
+        self.present()
     
-    def draw_background(self, room_index):
-        random.seed(self.background_seed + room_index)
+    def present(self):
+        # Only steady gameplay over an unchanged static layer can be presented
+        # with dirty rects, anything else needs the whole frame
+        room = self.room_manager.current_room
+        scene = (self.title_screen, self.level_select_screen, self.game_state, room, room.static_layer,
+                 self.room_transition.is_active())
+        if (scene != self.last_scene or self.title_screen or self.level_select_screen
+                or self.game_state != "PLAYING" or self.room_transition.is_active()):
+            dirty_rects.invalidate()
+        self.last_scene = scene
+        self.display.present(dirty_rects.take_rects())
+        for hook in self.present_hooks:
+            hook(self)
+    
+    def get_background(self, room_index):
+        # Only regenerate the pattern when the room or the seed actually changes
+        key = (room_index, self.background_seed)
+        if self.background_key != key:
+            self.background = self.render_background(room_index)
+            self.background_key = key
+        return self.background
+
+    def render_background(self, room_index):
+        rng = random.Random(self.background_seed + room_index)
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         # Choose a base color per room
         base_colors = [
             (20, 20, 60), (40, 20, 40), (20, 40, 20), (40, 40, 20),
             (20, 40, 60), (60, 20, 40), (40, 60, 20)
         ]
         color = base_colors[room_index % len(base_colors)]
-        self.screen.fill(color)
+        background.fill(color)
         # Draw 8-bit geometric patterns
         pattern_type = room_index % 3
         for y in range(0, SCREEN_HEIGHT, 16):
             for x in range(0, SCREEN_WIDTH, 16):
                 if pattern_type == 0:  # Checker
                     if (x//16 + y//16) % 2 == 0:
-                        pygame.draw.rect(self.screen, (min(color[0]+30,255), min(color[1]+30,255), min(color[2]+30,255)), (x, y, 16, 16))
+                        background.fill((min(color[0]+30,255), min(color[1]+30,255), min(color[2]+30,255)), (x, y, 16, 16))
                 elif pattern_type == 1:  # Stripes
                     if (y//16) % 2 == 0:
-                        pygame.draw.rect(self.screen, (max(color[0]-20,0), max(color[1]-20,0), max(color[2]-20,0)), (x, y, 16, 16))
+                        background.fill((max(color[0]-20,0), max(color[1]-20,0), max(color[2]-20,0)), (x, y, 16, 16))
                 elif pattern_type == 2:  # Dots
-                    if random.random() < 0.2:
-                        pygame.draw.circle(self.screen, (255,255,255), (x+8, y+8), 2)
+                    if rng.random() < 0.2:
+                        pygame.draw.circle(background, (255,255,255), (x+8, y+8), 2)
+        return background
 
     def draw_title_screen(self):
         # Draw title
-        title = self.large_font.render("CONTROL SHIFT", True, PINK_PASTEL)
-        subtitle = self.font.render("Something strange is happening to your controls...", True, WHITE)
-        start_text = self.font.render("Press any key to begin", True, LIGHT_GRAY)
+        title = render_text("CONTROL SHIFT", 48, PINK_PASTEL)
+        subtitle = render_text("Something strange is happening to your controls...", 24, WHITE)
+        start_text = render_text("Press any key to begin", 24, LIGHT_GRAY)
         
         self.screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, SCREEN_HEIGHT // 3))
         self.screen.blit(subtitle, (SCREEN_WIDTH // 2 - subtitle.get_width() // 2, SCREEN_HEIGHT // 2))
@@ -380,7 +661,7 @@ class Game:
         # Draw level select screen
         self.screen.fill((30, 0, 50))
         
-        title = self.large_font.render("SELECT LEVEL", True, PINK_PASTEL)
+        title = render_text("SELECT LEVEL", 48, PINK_PASTEL)
         self.screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, 50))
         
         # Level descriptions
@@ -397,7 +678,7 @@ class Game:
         y_start = 150
         for i, level_desc in enumerate(levels):
             color = WHITE if i < len(self.room_manager.rooms) else GRAY
-            text = self.font.render(level_desc, True, color)
+            text = render_text(level_desc, 24, color)
             self.screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_start + i * 40))
         
         # Instructions
@@ -408,36 +689,88 @@ class Game:
         
         y_start = 450
         for i, instruction in enumerate(instructions):
-            text = self.font.render(instruction, True, LIGHT_GRAY)
+            text = render_text(instruction, 24, LIGHT_GRAY)
             self.screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_start + i * 30))
 
-    def draw_transition_screen(self):
-        # Draw transition message
-        message = self.large_font.render(self.transition_message, True, PINK_PASTEL)
-        continue_text = self.font.render("Press any key to continue", True, WHITE)
+    def render_transition_screen(self):
+        # Draw transition message once into the persistent transition screen
+        self.transition_screen.fill(BLACK)
+        message = render_text(self.transition_message, 48, PINK_PASTEL)
+        continue_text = render_text("Press any key to continue", 24, WHITE)
         
-        self.screen.blit(message, (SCREEN_WIDTH // 2 - message.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
-        self.screen.blit(continue_text, (SCREEN_WIDTH // 2 - continue_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
-        
-        # Increment transition counter
-        self.transition_counter += 1
+        self.transition_screen.blit(message, (SCREEN_WIDTH // 2 - message.get_width() // 2, SCREEN_HEIGHT // 2 - 50))
+        self.transition_screen.blit(continue_text, (SCREEN_WIDTH // 2 - continue_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
+        self.transition_screen_message = self.transition_message
+
+    def draw_transition_screen(self):
+        # A loaded savestate only brings the message, render it on first use
+        if self.transition_screen_message != self.transition_message:
+            self.render_transition_screen()
+        self.screen.blit(self.transition_screen, (0, 0))
+
+    def step(self, keys):
+        # One fixed simulation step with the given KeyState (or mask)
+        if not isinstance(keys, KeyState):
+            keys = KeyState(keys)
+        self.player.begin_tick()
+        self.update(keys)
+        self.last_keys = keys
+        self.tick_count += 1
+        for hook in self.tick_hooks:
+            hook(self, keys)
+
+    def tick(self):
+        self.step(self.input_source.poll())
+
+    def advance(self):
+        # Run as many fixed ticks as the elapsed real time calls for
+        now = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = now
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        ticks = 0
+        while self.accumulator >= self.tick_duration:
+            if ticks == MAX_TICKS_PER_FRAME:
+                # Too far behind, drop the backlog rather than spiral
+                self.accumulator = 0.0
+                break
+            self.tick()
+            self.accumulator -= self.tick_duration
+            ticks += 1
+        # How far we are between the last tick and the next one
+        self.player.render_alpha = self.accumulator / self.tick_duration
 
     def run(self):
         # Main game loop
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
+        try:
+            while self.running:
+                self.handle_events()
+                self.advance()
+                self.draw()
+                self.clock.tick(MAX_RENDER_FPS)
+        except Exception:
+            self.save_crash_state()
+            raise
+        self.stop_recording()
+        if self.latency_probe is not None:
+            self.latency_probe.save_session()
 
     async def run_async(self):
         # Async main game loop for web deployment
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
-            await asyncio.sleep(0)  # Allow other tasks to run
+        try:
+            while self.running:
+                self.handle_events()
+                self.advance()
+                self.draw()
+                self.clock.tick(MAX_RENDER_FPS)
+                await asyncio.sleep(0)  # Allow other tasks to run
+        except Exception:
+            self.save_crash_state()
+            raise
+        self.stop_recording()
+        if self.latency_probe is not None:
+            self.latency_probe.save_session()
 
 if __name__ == "__main__":
     pygame.init()
@@ -0,0 +1,151 @@
+import pygame
+import time
+
+# Keys the simulation can see, one bit each in a KeyState mask. Every room's
+# control scheme only uses these, plus R for rewinding.
+TRACKED_KEYS = (
+    pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN,
+    pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s,
+    pygame.K_SPACE, pygame.K_q, pygame.K_e,
+    pygame.K_f, pygame.K_h, pygame.K_t,
+    pygame.K_r,
+)
+KEY_BITS = {key: 1 << i for i, key in enumerate(TRACKED_KEYS)}
+# Set while any key outside TRACKED_KEYS is held ("press any key")
+OTHER_KEY_BIT = 1 << 15
+
+class KeyState:
+    # Held keys for one tick as a bit mask. Indexes like the list from
+    # pygame.key.get_pressed(), so rooms can't tell where it came from.
+    __slots__ = ("mask",)
+
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    @classmethod
+    def from_pressed(cls, pressed):
+        mask = 0
+        held = 0
+        for key, bit in KEY_BITS.items():
+            if pressed[key]:
+                mask |= bit
+                held += 1
+        if sum(pressed) > held:
+            mask |= OTHER_KEY_BIT
+        return cls(mask)
+
+    def __getitem__(self, key):
+        return self.mask & KEY_BITS.get(key, 0) != 0
+
+    def pressed_since(self, previous):
+        # Keys down now that weren't down in the previous state
+        return self.mask & ~previous.mask != 0
+
+    def __eq__(self, other):
+        return isinstance(other, KeyState) and self.mask == other.mask
+
+    def __hash__(self):
+        return self.mask
+
+    def __repr__(self):
+        return "KeyState(0x%04x)" % self.mask
+
+NO_KEYS = KeyState(0)
+
+class KeyboardInput:
+    # The live keyboard, sampled once per tick
+    def poll(self):
+        return KeyState.from_pressed(pygame.key.get_pressed())
+
+class InputTracker:
+    # The live keyboard built from KEYDOWN/KEYUP events (fed by
+    # Game.handle_events) instead of sampling it once per tick. A key tapped
+    # and released between two ticks still counts as held for one tick, and
+    # every change is timestamped with perf_counter_ns when it's read.
+    def __init__(self):
+        self.held = 0
+        self.other_keys = set()  # Untracked keys down, behind OTHER_KEY_BIT
+        # Changes since the last poll(): edge masks and (time_ns, bits, down)
+        self.pressed = 0
+        self.released = 0
+        self.events = []
+        # What the last poll() covered
+        self.tick_pressed = 0
+        self.tick_released = 0
+        self.tick_events = []
+        self.states = {}  # One KeyState per distinct mask
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            self.key_down(event.key, time.perf_counter_ns())
+        elif event.type == pygame.KEYUP:
+            self.key_up(event.key, time.perf_counter_ns())
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            # Key ups never arrive for keys let go outside the window
+            self.release_all(time.perf_counter_ns())
+
+    def key_down(self, key, time_ns):
+        bit = KEY_BITS.get(key)
+        if bit is None:
+            self.other_keys.add(key)
+            bit = OTHER_KEY_BIT
+        if not self.held & bit:
+            self.held |= bit
+            self.pressed |= bit
+            self.events.append((time_ns, bit, True))
+
+    def key_up(self, key, time_ns):
+        bit = KEY_BITS.get(key)
+        if bit is None:
+            self.other_keys.discard(key)
+            if self.other_keys:
+                return
+            bit = OTHER_KEY_BIT
+        if self.held & bit:
+            self.held &= ~bit
+            self.released |= bit
+            self.events.append((time_ns, bit, False))
+
+    def release_all(self, time_ns):
+        self.other_keys.clear()
+        if self.held:
+            self.released |= self.held
+            self.events.append((time_ns, self.held, False))
+            self.held = 0
+
+    def poll(self):
+        # Keys for the next tick: everything held, plus taps already released
+        mask = self.held | self.pressed
+        self.tick_pressed = self.pressed
+        self.tick_released = self.released
+        self.tick_events, self.events = self.events, self.tick_events
+        self.events.clear()
+        self.pressed = 0
+        self.released = 0
+        state = self.states.get(mask)
+        if state is None:
+            state = self.states[mask] = KeyState(mask)
+        return state
+
+    def was_pressed(self, key):
+        # Went down during the last polled tick (even if already released)
+        return self.tick_pressed & KEY_BITS.get(key, 0) != 0
+
+    def was_released(self, key):
+        return self.tick_released & KEY_BITS.get(key, 0) != 0
+
+class ScriptedInput:
+    # Plays back a list of masks (or KeyStates), one per tick, then nothing
+    def __init__(self, masks):
+        self.states = [state if isinstance(state, KeyState) else KeyState(state) for state in masks]
+        self.position = 0
+
+    def poll(self):
+        if self.position >= len(self.states):
+            return NO_KEYS
+        state = self.states[self.position]
+        self.position += 1
+        return state
+
+    def finished(self):
+        return self.position >= len(self.states)
@@ -0,0 +1,107 @@
+import os
+import time
+from src.constants import *
+from src.fonts import render_text
+from src.dirty_rects import dirty_rects
+from src.input import InputTracker
+
+# Latencies measured for every input event
+KINDS = ("simulated", "presented")
+
+def percentile(histogram, fraction):
+    # Upper edge (ms) of the bucket holding the given fraction of samples
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    target = fraction * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return (i + 1) * LATENCY_BUCKET_MS
+    return len(histogram) * LATENCY_BUCKET_MS
+
+class LatencyProbe:
+    # Measures how long each key event takes to reach the simulation (the
+    # end of the tick that first saw it) and the screen (the end of the
+    # first present after that tick). Events come timestamped from the
+    # InputTracker; anything else as input source gives no samples.
+    def __init__(self):
+        # Events simulated but not yet presented: [time_ns, bits, down, simulated_ns]
+        self.pending = []
+        # One row per event: (time_ns, bits, down, simulated_ns, presented_ns)
+        self.rows = []
+        self.histograms = {kind: [0] * LATENCY_BUCKETS for kind in KINDS}
+        self.overlay = LATENCY_OVERLAY
+        self.overlay_lines = []
+        self.overlay_updated = 0
+
+    def attach(self, game):
+        game.tick_hooks.append(self.simulated)
+        game.present_hooks.append(self.presented)
+
+    def detach(self, game):
+        game.tick_hooks.remove(self.simulated)
+        game.present_hooks.remove(self.presented)
+
+    def simulated(self, game, keys):
+        # Tick hook: the events polled for this tick have now been simulated
+        source = game.input_source
+        if not isinstance(source, InputTracker) or not source.tick_events:
+            return
+        now = time.perf_counter_ns()
+        for time_ns, bits, down in source.tick_events:
+            self.pending.append((time_ns, bits, down, now))
+
+    def presented(self, game):
+        # Present hook: everything simulated so far is on screen now
+        if not self.pending:
+            return
+        now = time.perf_counter_ns()
+        for time_ns, bits, down, simulated_ns in self.pending:
+            self.rows.append((time_ns, bits, down, simulated_ns, now))
+            self.add_sample("simulated", simulated_ns - time_ns)
+            self.add_sample("presented", now - time_ns)
+        self.pending.clear()
+
+    def add_sample(self, kind, latency_ns):
+        bucket = int(latency_ns / 1e6 / LATENCY_BUCKET_MS)
+        self.histograms[kind][min(max(bucket, 0), LATENCY_BUCKETS - 1)] += 1
+
+    def summary(self):
+        # One line per kind: count, median, 95th and 99th percentile in ms
+        lines = []
+        for kind in KINDS:
+            histogram = self.histograms[kind]
+            lines.append(f"input->{kind}: n={sum(histogram)} p50={percentile(histogram, 0.5):.1f}ms "
+                         f"p95={percentile(histogram, 0.95):.1f}ms p99={percentile(histogram, 0.99):.1f}ms")
+        return lines
+
+    def draw(self, screen):
+        # Summary in the top right corner, re-rendered twice a second
+        now = time.perf_counter()
+        if now - self.overlay_updated >= 0.5:
+            self.overlay_lines = self.summary()
+            self.overlay_updated = now
+        for i, line in enumerate(self.overlay_lines):
+            text = render_text(line, 20, WHITE)
+            position = (SCREEN_WIDTH - text.get_width() - 10, 10 + i * 18)
+            dirty_rects.mark(("latency", i), screen.blit(text, position))
+
+    def save_csv(self, path):
+        with open(path, "w") as f:
+            f.write("event_ns,keys,down,simulated_ms,presented_ms\n")
+            for time_ns, bits, down, simulated_ns, presented_ns in self.rows:
+                f.write(f"{time_ns},{bits},{int(down)},{(simulated_ns - time_ns) / 1e6:.3f},"
+                        f"{(presented_ns - time_ns) / 1e6:.3f}\n")
+
+    def save_session(self):
+        # Write this session's samples to LATENCY_DIR and print the summary
+        if not self.rows:
+            return
+        os.makedirs(LATENCY_DIR, exist_ok=True)
+        path = os.path.join(LATENCY_DIR, time.strftime("%Y%m%d-%H%M%S") + ".csv")
+        self.save_csv(path)
+        print(f"Saved input latency: {path}")
+        for line in self.summary():
+            print(line)
@@ -1,38 +1,92 @@
 import pygame
+import struct
 from src.constants import *
+from src.dirty_rects import dirty_rects
+
+INF = float("inf")
 
 class Player:
+    # Fixed attribute layout, the player is touched many times every tick
+    __slots__ = (
+        "width", "height", "x", "y", "prev_x", "prev_y", "render_alpha",
+        "vel_x", "vel_y", "gravity", "jump_strength", "on_ground", "facing_right",
+        "state", "animation_frame", "animation_delay", "animation_counter",
+        "rect", "swept_rect",
+    )
+
+    # Columns of the shared sprite atlas (row 0 faces right, row 1 faces left)
+    ATLAS_FRAMES = ["idle", "walk_0", "walk_1", "jump"]
+    # Atlas column per animation frame for each state update() sets, one per
+    # value of animation_frame (which alternates 0, 1)
+    STATE_FRAMES = {
+        "idle": (0, 0),
+        "walk": (1, 2),
+        "jump": (3, 3),
+    }
+    STATES = tuple(STATE_FRAMES)
+    # Most separate contacts resolved in one move (wall, then floor, ...)
+    MAX_CONTACTS = 3
+    # Simulation state for snapshots: position, velocity, flags, animation
+    SIM_STATE = struct.Struct("<dddd??BBB")
+    # Savestates add the room's gravity and jump strength
+    SAVE_STATE = struct.Struct("<dd")
+    # Shared by all players and built once per process
+    atlas = None
+    frame_rects = None
+
     def __init__(self):
         self.width = 24
         self.height = 32
         self.x = 100
         self.y = 300
+        # Position at the start of the current tick, for render interpolation
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.render_alpha = 1.0
         self.vel_x = 0
         self.vel_y = 0
+        # Gravity per tick (negative pulls up) and the jump velocity, set by rooms
+        self.gravity = GRAVITY
+        self.jump_strength = JUMP_STRENGTH
+        # on_ground means resting on whatever gravity pulls us against
         self.on_ground = False
         self.facing_right = True
         self.state = "idle"
         self.animation_frame = 0
         self.animation_delay = 6
         self.animation_counter = 0
-        self.generate_sprites()
+        # Persistent rects, updated in place instead of allocated every tick
+        self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
+        self.swept_rect = pygame.Rect(0, 0, 0, 0)
+        if Player.atlas is None:
+            self.generate_sprites()
 
     def generate_sprites(self):
-        # Generate 8-bit style pixel art for player
-        self.sprites = {"idle": [], "walk": [], "jump": []}
-        # Idle: standing
-        surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.draw_pixel_player(surf, eye_offset=0)
-        self.sprites["idle"].append(surf)
-        # Walk: 2 frames
-        for i in range(2):
+        # Generate 8-bit style pixel art for player into one atlas surface
+        frames = len(self.ATLAS_FRAMES)
+        atlas = pygame.Surface((frames * self.width, 2 * self.height), pygame.SRCALPHA)
+        for column, name in enumerate(self.ATLAS_FRAMES):
             surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            self.draw_pixel_player(surf, eye_offset=i*2-1, leg_up=(i==1))
-            self.sprites["walk"].append(surf)
-        # Jump: 1 frame
-        surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.draw_pixel_player(surf, eye_offset=0, arms_up=True)
-        self.sprites["jump"].append(surf)
+            if name == "idle":  # Idle: standing
+                self.draw_pixel_player(surf, eye_offset=0)
+            elif name == "jump":  # Jump: arms up
+                self.draw_pixel_player(surf, eye_offset=0, arms_up=True)
+            else:  # Walk: 2 frames
+                i = int(name[-1])
+                self.draw_pixel_player(surf, eye_offset=i*2-1, leg_up=(i==1))
+            # Pre-flip the left-facing copy so drawing never has to
+            atlas.blit(surf, (column * self.width, 0))
+            atlas.blit(pygame.transform.flip(surf, True, False), (column * self.width, self.height))
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+        # frame_rects[state][facing_right][animation_frame] -> atlas subrect
+        frame_rects = {}
+        for state, columns in self.STATE_FRAMES.items():
+            left = tuple(pygame.Rect(c * self.width, self.height, self.width, self.height) for c in columns)
+            right = tuple(pygame.Rect(c * self.width, 0, self.width, self.height) for c in columns)
+            frame_rects[state] = (left, right)
+        Player.atlas = atlas
+        Player.frame_rects = frame_rects
 
     def draw_pixel_player(self, surf, eye_offset=0, leg_up=False, arms_up=False):
         # Body
@@ -57,82 +111,211 @@ class Player:
             pygame.draw.rect(surf, (200, 100, 120), (8, 24, 4, 8))
             pygame.draw.rect(surf, (200, 100, 120), (12, 24, 4, 8))
 
+    def place(self, position):
+        # Move without interpolating from the old position (spawn, respawn)
+        self.x, self.y = position
+        self.prev_x, self.prev_y = position
+
+    def set_gravity(self, gravity, jump_strength=None):
+        # Jumping always pushes away from the side gravity pulls towards
+        self.gravity = gravity
+        if jump_strength is None:
+            jump_strength = JUMP_STRENGTH if gravity >= 0 else -JUMP_STRENGTH
+        self.jump_strength = jump_strength
+
+    def pack_sim_state(self):
+        return self.SIM_STATE.pack(self.x, self.y, self.vel_x, self.vel_y, self.on_ground, self.facing_right,
+                                   self.STATES.index(self.state), self.animation_frame, self.animation_counter)
+
+    def unpack_sim_state(self, data, offset=0):
+        # Restore a pack_sim_state() snapshot, returns the offset after it
+        (self.x, self.y, self.vel_x, self.vel_y, self.on_ground, self.facing_right,
+         state, self.animation_frame, self.animation_counter) = self.SIM_STATE.unpack_from(data, offset)
+        self.state = self.STATES[state]
+        return offset + self.SIM_STATE.size
+
+    def pack_save_state(self):
+        return self.SAVE_STATE.pack(self.gravity, self.jump_strength) + self.pack_sim_state()
+
+    def unpack_save_state(self, data, offset=0):
+        gravity, jump_strength = self.SAVE_STATE.unpack_from(data, offset)
+        self.set_gravity(gravity, jump_strength)
+        offset = self.unpack_sim_state(data, offset + self.SAVE_STATE.size)
+        self.prev_x = self.x
+        self.prev_y = self.y
+        return offset
+
+    def begin_tick(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
+
     def get_rect(self):
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+        # The same rect every call, synced to the current position (truncated
+        # like pygame.Rect(x, y, ...) would). Copy it if you need to keep it.
+        rect = self.rect
+        rect.x = int(self.x)
+        rect.y = int(self.y)
+        return rect
 
-    def handle_input(self, keys, control_scheme):
-        self.vel_x = 0
-        for action, key_list in control_scheme.items():
-            for key in key_list:
-                if keys[key]:
-                    if action == "left":
-                        self.vel_x = -PLAYER_SPEED
-                        self.facing_right = False
-                    elif action == "right":
-                        self.vel_x = PLAYER_SPEED
-                        self.facing_right = True
-                    elif action == "jump" and self.on_ground:
-                        self.vel_y = JUMP_STRENGTH
-                        self.on_ground = False
-
-    def update(self, platforms):
+    def apply_actions(self, actions):
+        # actions is a mask of ACTION_* bits, right wins over left
+        if actions & ACTION_RIGHT:
+            self.vel_x = PLAYER_SPEED
+            self.facing_right = True
+        elif actions & ACTION_LEFT:
+            self.vel_x = -PLAYER_SPEED
+            self.facing_right = False
+        else:
+            self.vel_x = 0
+        if actions & ACTION_JUMP and self.on_ground:
+            self.vel_y = self.jump_strength
+            self.on_ground = False
+
+    def update(self, platforms, dt=1.0):
+        # platforms is the room's SpatialGrid of platforms, dt is in ticks
         if not self.on_ground:
-            self.vel_y += GRAVITY
-        self.x += self.vel_x
-        self.y += self.vel_y
+            self.vel_y += self.gravity * dt
+        self.check_collisions(platforms, self.vel_x * dt, self.vel_y * dt)
         if not self.on_ground:
-            if self.vel_y < 0:
-                self.state = "jump"
-            else:
-                self.state = "jump"
+            self.state = "jump"
         else:
             if self.vel_x == 0:
                 self.state = "idle"
             else:
                 self.state = "walk"
-        self.check_collisions(platforms)
         self.animation_counter += 1
         if self.animation_counter >= self.animation_delay:
             self.animation_counter = 0
             self.animation_frame = (self.animation_frame + 1) % 2
 
-    def check_collisions(self, platforms):
-        player_rect = self.get_rect()
+    def check_collisions(self, platforms, dx, dy):
+        # Move by (dx, dy) with swept AABB collision: advance to the first
+        # platform along the motion, stop on that axis, then carry on with
+        # the rest of the other axis. Nothing can be tunnelled through.
+        falls_down = self.gravity >= 0
         self.on_ground = False
-        for platform in platforms:
-            if player_rect.colliderect(platform):
-                if self.vel_y > 0 and player_rect.bottom > platform.top and player_rect.bottom - self.vel_y <= platform.top + 10:
-                    self.y = platform.top - self.height
-                    self.vel_y = 0
-                    self.on_ground = True
-                elif self.vel_y < 0 and player_rect.top < platform.bottom and player_rect.top - self.vel_y >= platform.bottom - 10:
-                    self.y = platform.bottom
-                    self.vel_y = 0
-                elif self.vel_x > 0 and player_rect.right > platform.left and player_rect.right - self.vel_x <= platform.left + 10:
-                    self.x = platform.left - self.width
-                elif self.vel_x < 0 and player_rect.left < platform.right and player_rect.left - self.vel_x >= platform.right - 10:
-                    self.x = platform.right
+        # Only platforms near the path we move along (and just below it) can be hit
+        swept = self.swept_rect
+        swept.x = int(min(self.x, self.x + dx)) - 1
+        swept.y = int(min(self.y, self.y + dy)) - 1
+        swept.width = int(abs(dx)) + self.width + 3
+        swept.height = int(abs(dy)) + self.height + 3
+        candidates = platforms.query(swept)
+        self.resolve_overlaps(candidates)
+        for _ in range(self.MAX_CONTACTS):
+            if dx == 0 and dy == 0:
+                break
+            hit_time = 1.0
+            hit_axis = None
+            hit_platform = None
+            for platform in candidates:
+                time, axis = self.sweep(platform, dx, dy)
+                if axis is not None and time < hit_time:
+                    hit_time, hit_axis, hit_platform = time, axis, platform
+            self.x += dx * hit_time
+            self.y += dy * hit_time
+            if hit_axis is None:
+                break
+            if hit_axis == "x":
+                # Snap against the wall and keep sliding vertically
+                self.x = hit_platform.left - self.width if dx > 0 else hit_platform.right
+                dx = 0
+                dy *= 1 - hit_time
+            else:
+                # Landed if we were moving with gravity, otherwise hit our head
+                if dy > 0:
+                    self.y = hit_platform.top - self.height
+                    self.on_ground = self.on_ground or falls_down
+                else:
+                    self.y = hit_platform.bottom
+                    self.on_ground = self.on_ground or not falls_down
+                self.vel_y = 0
+                dy = 0
+                dx *= 1 - hit_time
+        if not self.on_ground and self.vel_y * self.gravity >= 0:
+            self.on_ground = self.is_standing_on(candidates)
         if self.x < 0:
             self.x = 0
         if self.x > SCREEN_WIDTH - self.width:
             self.x = SCREEN_WIDTH - self.width
-        if self.y < 0:
+        if self.y <= 0:
             self.y = 0
             self.vel_y = 0
-        if self.y > SCREEN_HEIGHT - self.height:
+            self.on_ground = self.on_ground or not falls_down
+        if self.y >= SCREEN_HEIGHT - self.height:
             self.y = SCREEN_HEIGHT - self.height
             self.vel_y = 0
-            self.on_ground = True
+            self.on_ground = self.on_ground or falls_down
 
-    def draw(self, screen):
-        if self.state == "idle":
-            sprite = self.sprites["idle"][0]
-        elif self.state == "walk":
-            sprite = self.sprites["walk"][self.animation_frame]
+    def sweep(self, platform, dx, dy):
+        # Time (0..1 of the move) at which our box first touches the platform,
+        # and the axis it touches on, or (1.0, None) if it doesn't within the move
+        if dx > 0:
+            x_entry = (platform.left - (self.x + self.width)) / dx
+            x_exit = (platform.right - self.x) / dx
+        elif dx < 0:
+            x_entry = (platform.right - self.x) / dx
+            x_exit = (platform.left - (self.x + self.width)) / dx
+        elif self.x + self.width <= platform.left or self.x >= platform.right:
+            return 1.0, None
+        else:
+            x_entry, x_exit = -INF, INF
+        if dy > 0:
+            y_entry = (platform.top - (self.y + self.height)) / dy
+            y_exit = (platform.bottom - self.y) / dy
+        elif dy < 0:
+            y_entry = (platform.bottom - self.y) / dy
+            y_exit = (platform.top - (self.y + self.height)) / dy
+        elif self.y + self.height <= platform.top or self.y >= platform.bottom:
+            return 1.0, None
         else:
-            sprite = self.sprites["jump"][0]
-        if self.facing_right:
-            screen.blit(sprite, (self.x, self.y))
+            y_entry, y_exit = -INF, INF
+        entry = max(x_entry, y_entry)
+        if entry >= min(x_exit, y_exit) or entry < 0 or entry > 1:
+            return 1.0, None
+        return entry, ("x" if x_entry > y_entry else "y")
+
+    def resolve_overlaps(self, platforms):
+        # Push out of platforms we already overlap (e.g. a spawn point sunk
+        # into a ledge) along the shortest way out
+        for platform in platforms:
+            if (self.x + self.width <= platform.left or self.x >= platform.right
+                    or self.y + self.height <= platform.top or self.y >= platform.bottom):
+                continue
+            up = self.y + self.height - platform.top
+            down = platform.bottom - self.y
+            left = self.x + self.width - platform.left
+            right = platform.right - self.x
+            shortest = min(up, down, left, right)
+            if shortest == up:
+                self.y = platform.top - self.height
+                self.vel_y = min(self.vel_y, 0)
+                self.on_ground = self.on_ground or self.gravity >= 0
+            elif shortest == down:
+                self.y = platform.bottom
+                self.vel_y = max(self.vel_y, 0)
+                self.on_ground = self.on_ground or self.gravity < 0
+            elif shortest == left:
+                self.x = platform.left - self.width
+            else:
+                self.x = platform.right
+
+    def is_standing_on(self, platforms):
+        # Resting exactly against a platform on the gravity side counts as ground
+        if self.gravity >= 0:
+            bottom = self.y + self.height
+            for platform in platforms:
+                if bottom == platform.top and self.x + self.width > platform.left and self.x < platform.right:
+                    return True
         else:
-            flipped = pygame.transform.flip(sprite, True, False)
-            screen.blit(flipped, (self.x, self.y)) 
\ No newline at end of file
+            for platform in platforms:
+                if self.y == platform.bottom and self.x + self.width > platform.left and self.x < platform.right:
+                    return True
+        return False
+
+    def draw(self, screen):
+        area = self.frame_rects[self.state][self.facing_right][self.animation_frame]
+        # Draw between the last two simulated positions
+        x = self.prev_x + (self.x - self.prev_x) * self.render_alpha
+        y = self.prev_y + (self.y - self.prev_y) * self.render_alpha
+        dirty_rects.mark("player", screen.blit(self.atlas, (x, y), area))
\ No newline at end of file
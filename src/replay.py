@@ -0,0 +1,207 @@
+import pygame
+import struct
+import sys
+import time
+import zlib
+from src.constants import *
+from src.input import KeyState, NO_KEYS
+
+# File layout: MAGIC, version, then one zlib stream holding the header
+# (seed, start room, hash interval, tick count, run count), the 16-bit state
+# hashes, and the input runs stored column by column (mask low bytes, mask
+# high bytes, varint run lengths) so similar bytes sit together
+MAGIC = b"CSRP"
+VERSION = 2
+HEADER = struct.Struct("<IBHII")
+
+def state_hash(game, tick):
+    # CRC of the simulated state that matters for a replay staying in sync,
+    # folded to 16 bits (a real desync keeps failing later checks anyway).
+    # tick counts from the start of the recording, not of the game, which
+    # has already been through the title screens when recording starts.
+    player = game.player
+    data = (struct.pack("<IB", tick & 0xFFFFFFFF, game.current_room_index)
+            + game.game_state.encode()
+            + struct.pack("<dddd?", player.x, player.y, player.vel_x, player.vel_y, player.on_ground))
+    return zlib.crc32(data) & 0xFFFF
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+class Replay:
+    # A recorded session: the game seed, the room it started in and the keys
+    # held on every tick, run-length encoded
+    def __init__(self, seed, start_room, hash_interval=REPLAY_HASH_INTERVAL):
+        self.seed = seed
+        self.start_room = start_room
+        self.hash_interval = hash_interval
+        self.tick_count = 0
+        self.runs = []  # [mask, ticks] pairs
+        self.hashes = []  # state_hash after every hash_interval ticks
+
+    def append(self, mask):
+        runs = self.runs
+        if runs and runs[-1][0] == mask:
+            runs[-1][1] += 1
+        else:
+            runs.append([mask, 1])
+        self.tick_count += 1
+
+    def masks(self):
+        for mask, ticks in self.runs:
+            for _ in range(ticks):
+                yield mask
+
+    def save(self, path):
+        payload = bytearray(HEADER.pack(self.seed, self.start_room, self.hash_interval,
+                                        self.tick_count, len(self.runs)))
+        payload += struct.pack("<I%dH" % len(self.hashes), len(self.hashes), *self.hashes)
+        payload += bytes(mask & 0xFF for mask, ticks in self.runs)
+        payload += bytes(mask >> 8 for mask, ticks in self.runs)
+        for mask, ticks in self.runs:
+            write_varint(payload, ticks)
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack("<H", VERSION))
+            f.write(zlib.compress(bytes(payload), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        version, = struct.unpack_from("<H", data, 4)
+        if version != VERSION:
+            raise ValueError(f"{path} is replay version {version}, expected {VERSION}")
+        payload = zlib.decompress(data[6:])
+        seed, start_room, hash_interval, tick_count, run_count = HEADER.unpack_from(payload, 0)
+        offset = HEADER.size
+        hash_count, = struct.unpack_from("<I", payload, offset)
+        offset += 4
+        replay = cls(seed, start_room, hash_interval)
+        replay.hashes = list(struct.unpack_from("<%dH" % hash_count, payload, offset))
+        offset += 2 * hash_count
+        low = payload[offset:offset + run_count]
+        high = payload[offset + run_count:offset + 2 * run_count]
+        offset += 2 * run_count
+        for i in range(run_count):
+            ticks, offset = read_varint(payload, offset)
+            replay.runs.append([low[i] | high[i] << 8, ticks])
+        replay.tick_count = tick_count
+        return replay
+
+class Recorder:
+    # Tick hook that records the keys and a periodic state hash
+    def __init__(self, seed, start_room, hash_interval=REPLAY_HASH_INTERVAL):
+        self.replay = Replay(seed, start_room, hash_interval)
+
+    @property
+    def tick_count(self):
+        return self.replay.tick_count
+
+    def record(self, game, keys):
+        replay = self.replay
+        replay.append(keys.mask)
+        if replay.tick_count % replay.hash_interval == 0:
+            replay.hashes.append(state_hash(game, replay.tick_count))
+
+    def save(self, path):
+        self.replay.save(path)
+
+class Playback:
+    # Input source that feeds a replay's keys back in, and a tick hook that
+    # compares the state hashes against the recording
+    def __init__(self, replay):
+        self.replay = replay
+        self.states = {}  # One KeyState per distinct mask
+        self.masks = replay.masks()
+        self.position = 0
+        # First tick whose hash didn't match, None while in sync, with the
+        # recorded and the replayed hash at that tick
+        self.divergence = None
+        self.expected_hash = None
+        self.actual_hash = None
+
+    def poll(self):
+        mask = next(self.masks, None)
+        if mask is None:
+            return NO_KEYS
+        self.position += 1
+        state = self.states.get(mask)
+        if state is None:
+            state = self.states[mask] = KeyState(mask)
+        return state
+
+    def finished(self):
+        return self.position >= self.replay.tick_count
+
+    def check(self, game, keys):
+        # Checkpoints are placed by ticks played back, like the recording's
+        replay = self.replay
+        tick = self.position
+        if self.divergence is not None or tick % replay.hash_interval:
+            return
+        index = tick // replay.hash_interval - 1
+        if index >= len(replay.hashes):
+            return
+        actual = state_hash(game, tick)
+        if actual != replay.hashes[index]:
+            self.divergence = tick
+            self.expected_hash = replay.hashes[index]
+            self.actual_hash = actual
+
+def play(replay, realtime=False):
+    # Play a replay from a fresh game, either headless at full speed or in a
+    # window at the normal tick rate. Returns the Playback with the result.
+    from src.game import Game
+    if realtime:
+        pygame.init()
+    playback = Playback(replay)
+    game = Game(headless=not realtime, input_source=playback, seed=replay.seed)
+    game.tick_hooks.append(playback.check)
+    game.start_room(replay.start_room)
+    if realtime:
+        while game.running and not playback.finished():
+            game.handle_events()
+            game.advance()
+            game.draw()
+            game.clock.tick(MAX_RENDER_FPS)
+    else:
+        while not playback.finished():
+            game.tick()
+    return playback
+
+def main(args):
+    # python -m src.replay FILE [--realtime]
+    if not args:
+        print("usage: python -m src.replay FILE [--realtime]")
+        return 2
+    replay = Replay.load(args[0])
+    print(f"{args[0]}: {replay.tick_count} ticks ({replay.tick_count / FPS:.1f}s), "
+          f"room {replay.start_room + 1}, seed {replay.seed}")
+    start = time.perf_counter()
+    playback = play(replay, realtime="--realtime" in args)
+    elapsed = time.perf_counter() - start
+    if playback.divergence is None:
+        print(f"In sync for all {playback.position} ticks ({elapsed:.2f}s)")
+        return 0
+    print(f"Diverged at tick {playback.divergence}: expected hash "
+          f"0x{playback.expected_hash:04x}, got 0x{playback.actual_hash:04x} ({elapsed:.2f}s)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
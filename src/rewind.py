@@ -0,0 +1,81 @@
+from src.constants import *
+
+class RewindBuffer:
+    # Fixed-capacity ring of per-tick snapshots (bytes from pack_sim_state).
+    # Every keyframe_interval ticks a snapshot is kept whole as a keyframe,
+    # the ones in between only store the bytes that differ from their
+    # keyframe as (offset low, offset high, value) triples. Each entry holds
+    # its keyframe directly, so getting any snapshot back is one keyframe
+    # copy plus one delta, however far back it is.
+    def __init__(self, capacity=REWIND_SECONDS * FPS, keyframe_interval=REWIND_KEYFRAME_INTERVAL):
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        # (keyframe, ticks since keyframe, delta) per tick, oldest at start
+        self.entries = [None] * capacity
+        self.start = 0
+        self.count = 0
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.entries[i] = None
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, snapshot):
+        # Add the newest snapshot, dropping the oldest when full
+        newest = self.entry(0) if self.count else None
+        if (newest is None or newest[1] + 1 >= self.keyframe_interval
+                or len(newest[0]) != len(snapshot)):
+            entry = (snapshot, 0, b"")
+        else:
+            keyframe = newest[0]
+            delta = bytearray()
+            for offset, (old, new) in enumerate(zip(keyframe, snapshot)):
+                if old != new:
+                    delta += bytes((offset & 0xFF, offset >> 8, new))
+            entry = (keyframe, newest[1] + 1, bytes(delta))
+        if self.count < self.capacity:
+            self.entries[(self.start + self.count) % self.capacity] = entry
+            self.count += 1
+        else:
+            self.entries[self.start] = entry
+            self.start = (self.start + 1) % self.capacity
+
+    def entry(self, ticks_back):
+        return self.entries[(self.start + self.count - 1 - ticks_back) % self.capacity]
+
+    def seek(self, ticks_back):
+        # Snapshot from ticks_back ticks ago (0 is the newest), or None
+        if not 0 <= ticks_back < self.count:
+            return None
+        keyframe, since, delta = self.entry(ticks_back)
+        if not delta:
+            return keyframe
+        snapshot = bytearray(keyframe)
+        for i in range(0, len(delta), 3):
+            snapshot[delta[i] | delta[i + 1] << 8] = delta[i + 2]
+        return bytes(snapshot)
+
+    def step_back(self):
+        # Drop the newest snapshot and return the one before it, which becomes
+        # the newest. None once only the oldest is left.
+        if self.count < 2:
+            return None
+        self.entries[(self.start + self.count - 1) % self.capacity] = None
+        self.count -= 1
+        return self.seek(0)
+
+    def memory_size(self):
+        # Bytes held by snapshot data (keyframes counted once)
+        keyframes = set()
+        size = 0
+        for i in range(self.count):
+            keyframe, since, delta = self.entry(i)
+            size += len(delta)
+            if id(keyframe) not in keyframes:
+                keyframes.add(id(keyframe))
+                size += len(keyframe)
+        return size
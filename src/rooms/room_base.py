@@ -1,12 +1,59 @@
 import pygame
+import struct
 from src.constants import *
+from src.fonts import render_text
+from src.dirty_rects import dirty_rects
+from src.spatial import SpatialGrid
+from src.controls import ControlScheme
 import random
 
 class Room:
+    # Fixed attribute layout for the room bookkeeping; subclasses add their own
+    __slots__ = (
+        "player", "platforms", "exit_door", "platform_grid", "trigger_grid",
+        "fruit_handle", "background_color", "wall_color", "door_color",
+        "hint_revealed", "hint_timer", "hint_delay", "gravity", "jump_strength",
+        "control_scheme", "controls", "room_name", "hint_text", "initial_position",
+        "death_cooldown", "death_sound_played", "platform_seed", "block_textures",
+        "static_layer", "backdrop", "fruit_timer", "fruit_spawned",
+        "fruit_collected", "fruit_rect", "fruit_aura_angle", "fruit_duration",
+        "normal_controls_active",
+    )
+    # Controls the fruit restores, shared instead of rebuilt every tick
+    NORMAL_SCHEME = {
+        "left": [pygame.K_LEFT, pygame.K_a],
+        "right": [pygame.K_RIGHT, pygame.K_d],
+        "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
+    }
+    NORMAL_CONTROLS = ControlScheme.compile(NORMAL_SCHEME)
+    # Fruit aura animation: degrees per frame and how far the dots reach from
+    # the center (18px orbit + 7px radius)
+    FRUIT_AURA_STEP = 4
+    FRUIT_AURA_REACH = 26
+    # Simulation state for snapshots: hint/fruit timers, death cooldown, aura
+    # angle, fruit and control flags, and where the fruit was placed
+    SIM_STATE = struct.Struct("<IIHH????hh")
+    # Savestates add what survives leaving the room: the texture seed and
+    # where the player is placed on entering (it comes from the layout, so it
+    # depends on whether the room has been laid out yet)
+    SAVE_STATE = struct.Struct("<Ihh")
+    # Rooms that draw their platforms some other way turn this off, so no
+    # 8-bit textures are baked for them
+    textured_platforms = True
+    # Pre-rendered aura frames shared by all rooms, built on the first spawn
+    fruit_frames = None
+    fruit_frame_rects = None
+    fruit_frames_size = None
+
     def __init__(self, player):
         self.player = player
         self.platforms = []
         self.exit_door = None
+        # Spatial indexes for platforms and for things the player can touch
+        # (door, fruit), rebuilt whenever the layout changes
+        self.platform_grid = SpatialGrid()
+        self.trigger_grid = SpatialGrid()
+        self.fruit_handle = None
         self.background_color = BLACK
         self.wall_color = GRAY
         self.door_color = PINK_PASTEL
@@ -14,12 +61,16 @@ class Room:
         self.hint_timer = 0
         self.hint_delay = 300  # Show hint after 5 seconds (60 frames per second * 5)
         
+        # Gravity per tick and jump velocity the player gets in this room
+        self.gravity = GRAVITY
+        self.jump_strength = JUMP_STRENGTH
+        
         # Control scheme (default)
-        self.control_scheme = {
+        self.set_control_scheme({
             "left": [pygame.K_LEFT, pygame.K_a],
             "right": [pygame.K_RIGHT, pygame.K_d],
             "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
-        }
+        })
         
         # Custom messages for this room
         self.room_name = "???"
@@ -30,6 +81,13 @@ class Room:
         self.death_cooldown = 0
         self.death_sound_played = False
         self.platform_seed = random.randint(0, 100000)
+        # Pre-rendered platform textures, keyed by
+        # (width, height, color, pattern_type, seed)
+        self.block_textures = {}
+        # Everything that doesn't change between frames is baked in here
+        self.static_layer = None
+        # Background pattern provided by the game, drawn under the static layer
+        self.backdrop = None
         # Fruit mechanic
         self.fruit_timer = 0
         self.fruit_spawned = False
@@ -39,11 +97,67 @@ class Room:
         self.fruit_duration = 7200  # 2 minutes at 60 FPS
         self.normal_controls_active = False
     
+    def reseed(self, rng):
+        # Draw this room's random choices from rng so a game seed decides them
+        self.platform_seed = rng.randint(0, 100000)
+
+    def pack_sim_state(self):
+        # Subclasses append their own state after this
+        fruit = self.fruit_rect or (0, 0)
+        return Room.SIM_STATE.pack(self.hint_timer, self.fruit_timer, self.death_cooldown, self.fruit_aura_angle,
+                                   self.hint_revealed, self.fruit_spawned, self.fruit_collected,
+                                   self.normal_controls_active, fruit[0], fruit[1])
+
+    def unpack_sim_state(self, data, offset=0):
+        # Restore a pack_sim_state() snapshot, returns the offset after it
+        (self.hint_timer, self.fruit_timer, self.death_cooldown, self.fruit_aura_angle,
+         self.hint_revealed, fruit_spawned, self.fruit_collected, self.normal_controls_active,
+         fruit_x, fruit_y) = Room.SIM_STATE.unpack_from(data, offset)
+        # Put the fruit back in (or take it out of) the trigger grid to match
+        self.fruit_spawned = fruit_spawned
+        if not fruit_spawned:
+            self.remove_fruit()
+            self.fruit_rect = None
+        elif self.fruit_rect is None or self.fruit_rect.topleft != (fruit_x, fruit_y):
+            self.remove_fruit()
+            self.place_fruit(fruit_x, fruit_y)
+        elif self.fruit_handle is None:
+            self.fruit_handle = self.trigger_grid.insert(self.fruit_rect)
+        if self.fruit_collected:
+            self.remove_fruit()
+        return offset + Room.SIM_STATE.size
+
+    def pack_save_state(self):
+        return Room.SAVE_STATE.pack(self.platform_seed, *self.initial_position) + self.pack_sim_state()
+
+    def unpack_save_state(self, data, offset=0):
+        platform_seed, spawn_x, spawn_y = Room.SAVE_STATE.unpack_from(data, offset)
+        # Snapshots refer into the layout (zones, the fruit's place), so a
+        # room that was never entered is laid out first. Layouts are fixed,
+        # a room that has one keeps it.
+        if not self.platforms:
+            self.load_layout()
+        self.initial_position = (spawn_x, spawn_y)
+        if platform_seed != self.platform_seed:
+            # Textures come from the seed
+            self.platform_seed = platform_seed
+            self.invalidate_block_textures()
+            self.invalidate_static_layer()
+        return self.unpack_sim_state(data, offset + Room.SAVE_STATE.size)
+
+    def load_layout(self):
+        # Rebuild the layout without resetting anything, the static layer is
+        # baked again on the next draw
+        self.generate_layout()
+        self.build_spatial_index()
+        self.invalidate_static_layer()
+
     def enter(self):
         # Reset player position
-        self.player.x, self.player.y = self.initial_position
+        self.player.place(self.initial_position)
         self.player.vel_x = 0
         self.player.vel_y = 0
+        self.player.set_gravity(self.gravity, self.jump_strength)
         
         # Reset hint
         self.hint_revealed = False
@@ -51,6 +165,7 @@ class Room:
         
         # Generate the room layout
         self.generate_layout()
+        self.refresh_layout_caches()
         # Reset fruit
         self.fruit_timer = 0
         self.fruit_spawned = False
@@ -90,15 +205,23 @@ class Room:
     
     def respawn_player(self):
         # Reset player to initial position in this room
-        self.player.x, self.player.y = self.initial_position
+        self.player.place(self.initial_position)
         self.player.vel_x = 0
         self.player.vel_y = 0
         self.death_cooldown = 30  # Half-second cooldown (at 60 FPS)
         self.death_sound_played = False
     
-    def update(self):
-        # Get pressed keys
-        keys = pygame.key.get_pressed()
+    def set_control_scheme(self, control_scheme):
+        # Always change schemes through here so the compiled tables match
+        self.control_scheme = control_scheme
+        self.controls = ControlScheme.compile(control_scheme)
+    
+    def update(self, keys):
+        # keys is this tick's KeyState
+        
+        # Spin the fruit's aura once per tick, whatever the frame rate
+        if self.fruit_spawned and not self.fruit_collected:
+            self.fruit_aura_angle = (self.fruit_aura_angle + Room.FRUIT_AURA_STEP) % 360
         
         # Update death cooldown
         if self.death_cooldown > 0:
@@ -118,78 +241,160 @@ class Room:
         
         # Handle player input
         if self.normal_controls_active:
-            normal_scheme = {
-                "left": [pygame.K_LEFT, pygame.K_a],
-                "right": [pygame.K_RIGHT, pygame.K_d],
-                "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
-            }
-            self.player.handle_input(keys, normal_scheme)
+            self.player.apply_actions(self.NORMAL_CONTROLS.actions(keys))
         else:
             self.handle_input(keys)
         
         # Update player
-        self.player.update(self.platforms)
+        self.player.update(self.platform_grid)
         
         # Update hint timer
         self.hint_timer += 1
         if self.hint_timer >= self.hint_delay:
             self.hint_revealed = True
         
-        # Fruit collision
-        if self.fruit_spawned and not self.fruit_collected and self.fruit_rect:
-            if self.player.get_rect().colliderect(self.fruit_rect):
-                self.fruit_collected = True
-                self.normal_controls_active = True
-        
-        # Check if player reached the exit door
-        player_rect = self.player.get_rect()
-        if self.exit_door is not None and player_rect.colliderect(self.exit_door):
-            return True  # Room completed
-        return False  # Room not completed yet
+        # Fruit and door collision
+        return self.check_triggers()
+    
+    def check_triggers(self):
+        reached_door = False
+        for trigger in self.trigger_grid.colliding(self.player.get_rect()):
+            if trigger is self.fruit_rect:
+                self.collect_fruit()
+            elif trigger is self.exit_door:
+                reached_door = True  # Room completed
+        return reached_door
+    
+    def collect_fruit(self):
+        self.fruit_collected = True
+        self.normal_controls_active = True
+        self.remove_fruit()
+
+    def remove_fruit(self):
+        # Take the fruit out of the trigger grid (it stays in fruit_rect)
+        if self.fruit_handle is not None:
+            self.trigger_grid.remove(self.fruit_handle)
+            self.fruit_handle = None
     
     def handle_input(self, keys):
-        # Default implementation - just pass the control scheme to the player
-        self.player.handle_input(keys, self.control_scheme)
+        # Default implementation - just apply the room's controls to the player
+        self.player.apply_actions(self.controls.actions(keys))
     
-    def draw_8bit_block(self, screen, rect, color, pattern_type=0):
-        # Draw a block with a simple 8-bit pattern
-        block = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
+    def refresh_layout_caches(self):
+        # Rebuild everything derived from the layout (call after generate_layout)
+        self.build_spatial_index()
+        self.build_block_textures()
+        self.build_static_layer()
+
+    def build_spatial_index(self):
+        self.platform_grid = SpatialGrid(self.platforms)
+        self.trigger_grid = SpatialGrid()
+        if self.exit_door is not None:
+            self.trigger_grid.insert(self.exit_door)
+        self.fruit_handle = None
+
+    def invalidate_block_textures(self):
+        # Drop every cached platform texture (call when the layout changes)
+        self.block_textures.clear()
+
+    def build_block_textures(self):
+        # Bake the textures for the current layout once instead of every frame
+        self.invalidate_block_textures()
+        if not self.textured_platforms:
+            return
+        for platform in self.platforms:
+            self.get_block_texture(platform, self.wall_color, self.get_block_pattern(platform))
+
+    def get_block_pattern(self, rect):
+        if rect.height > TILE_SIZE:  # Floor
+            return 1
+        return 0  # Platform
+
+    def get_block_texture(self, rect, color, pattern_type=0):
+        seed = self.platform_seed + rect.x + rect.y + pattern_type
+        key = (rect.width, rect.height, tuple(color), pattern_type, seed)
+        block = self.block_textures.get(key)
+        if block is None:
+            block = self.render_8bit_block(rect.width, rect.height, color, pattern_type, seed)
+            self.block_textures[key] = block
+        return block
+
+    def render_8bit_block(self, width, height, color, pattern_type, seed):
+        # Render a block with a simple 8-bit pattern
+        block = pygame.Surface((width, height))
         block.fill(color)
-        random.seed(self.platform_seed + rect.x + rect.y + pattern_type)
+        # Private RNG so baking a texture never touches the global random state
+        rng = random.Random(seed)
         # Add a checker or stripe pattern
-        for y in range(0, rect.height, 4):
-            for x in range(0, rect.width, 4):
-                if pattern_type == 0:  # Checker
+        if pattern_type == 0:  # Checker
+            shade = (min(color[0]+30,255), min(color[1]+30,255), min(color[2]+30,255))
+        elif pattern_type == 1:  # Stripes
+            shade = (max(color[0]-30,0), max(color[1]-30,0), max(color[2]-30,0))
+        else:  # Dots
+            shade = (255,255,255)
+        for y in range(0, height, 4):
+            for x in range(0, width, 4):
+                if pattern_type == 0:
                     if (x//4 + y//4) % 2 == 0:
-                        pygame.draw.rect(block, (min(color[0]+30,255), min(color[1]+30,255), min(color[2]+30,255)), (x, y, 4, 4))
-                elif pattern_type == 1:  # Stripes
+                        block.fill(shade, (x, y, 4, 4))
+                elif pattern_type == 1:
                     if (y//4) % 2 == 0:
-                        pygame.draw.rect(block, (max(color[0]-30,0), max(color[1]-30,0), max(color[2]-30,0)), (x, y, 4, 4))
-                elif pattern_type == 2:  # Dots
-                    if random.random() < 0.2:
-                        pygame.draw.rect(block, (255,255,255), (x, y, 2, 2))
-        screen.blit(block, (rect.x, rect.y))
+                        block.fill(shade, (x, y, 4, 4))
+                elif pattern_type == 2:
+                    if rng.random() < 0.2:
+                        block.fill(shade, (x, y, 2, 2))
+        return block
+
+    def draw_8bit_block(self, screen, rect, color, pattern_type=0):
+        # Blit the cached texture for this block
+        screen.blit(self.get_block_texture(rect, color, pattern_type), (rect.x, rect.y))
+
+    def set_backdrop(self, backdrop):
+        # The static layer only needs rebaking when the backdrop really changes
+        if backdrop is not self.backdrop:
+            self.backdrop = backdrop
+            self.invalidate_static_layer()
+
+    def draw_background(self, surface):
+        if self.backdrop is not None:
+            surface.blit(self.backdrop, (0, 0))
+        else:
+            surface.fill(self.background_color)
+
+    def invalidate_static_layer(self):
+        self.static_layer = None
+
+    def build_static_layer(self):
+        # Render the static part of the room into one screen-sized surface
+        self.static_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.draw_static(self.static_layer)
 
     def draw(self, screen):
+        # One full-screen blit for the static layer, then the moving parts on top
+        if self.static_layer is None:
+            self.build_static_layer()
+        screen.blit(self.static_layer, (0, 0))
+        self.draw_dynamic(screen)
+
+    def draw_static(self, surface):
         # Draw background
-        screen.fill(self.background_color)
+        self.draw_background(surface)
         # Draw platforms with 8-bit patterns
-        for i, platform in enumerate(self.platforms):
-            if platform.height > TILE_SIZE:  # Floor
-                self.draw_8bit_block(screen, platform, self.wall_color, pattern_type=1)
-            else:  # Platform
-                self.draw_8bit_block(screen, platform, self.wall_color, pattern_type=0)
+        if self.textured_platforms:
+            for platform in self.platforms:
+                self.draw_8bit_block(surface, platform, self.wall_color, self.get_block_pattern(platform))
         # Draw exit door
         if self.exit_door is not None:
-            pygame.draw.rect(screen, self.door_color, self.exit_door)
+            pygame.draw.rect(surface, self.door_color, self.exit_door)
             # Draw door handle
             door_handle_x = self.exit_door.x + self.exit_door.width - 8
             door_handle_y = self.exit_door.y + self.exit_door.height // 2
-            pygame.draw.circle(screen, YELLOW_PASTEL, (door_handle_x, door_handle_y), 4)
+            pygame.draw.circle(surface, YELLOW_PASTEL, (door_handle_x, door_handle_y), 4)
         # Draw room name (more subtle)
-        font = pygame.font.Font(None, 28)
-        name_text = font.render(self.room_name, True, LIGHT_GRAY)
-        screen.blit(name_text, (20, 20))
+        name_text = render_text(self.room_name, 28, LIGHT_GRAY)
+        surface.blit(name_text, (20, 20))
+
+    def draw_dynamic(self, screen):
         # Draw fruit
         self.draw_fruit(screen)
         # Draw player
@@ -215,21 +420,51 @@ class Room:
             else:
                 fruit_x = floor.x
             fruit_y = floor.y - TILE_SIZE
-            self.fruit_rect = pygame.Rect(fruit_x + TILE_SIZE//4, fruit_y + TILE_SIZE//4, TILE_SIZE//2, TILE_SIZE//2)
+            self.place_fruit(fruit_x + TILE_SIZE//4, fruit_y + TILE_SIZE//4)
             self.fruit_spawned = True
 
+    def place_fruit(self, x, y):
+        self.fruit_rect = pygame.Rect(x, y, TILE_SIZE//2, TILE_SIZE//2)
+        self.fruit_handle = self.trigger_grid.insert(self.fruit_rect)
+        if Room.fruit_frames is None or Room.fruit_frames_size != self.fruit_rect.size:
+            self.build_fruit_frames(self.fruit_rect.size)
+
+    def build_fruit_frames(self, fruit_size):
+        # Pre-render every aura step (4 degrees apart) with the fruit on top,
+        # side by side in one strip
+        frame_size = 2 * Room.FRUIT_AURA_REACH
+        frame_count = 360 // Room.FRUIT_AURA_STEP
+        strip = pygame.Surface((frame_count * frame_size, frame_size), pygame.SRCALPHA)
+        fruit_rect = pygame.Rect(0, 0, fruit_size[0], fruit_size[1])
+        frame_rects = []
+        for frame in range(frame_count):
+            frame_rect = pygame.Rect(frame * frame_size, 0, frame_size, frame_size)
+            center = frame_rect.center
+            reach = Room.FRUIT_AURA_REACH
+            for i in range(8):
+                angle = frame * Room.FRUIT_AURA_STEP + i * (360 // 8)
+                aura = pygame.math.Vector2(1, 0).rotate(angle)
+                aura_x = frame_rect.x + int(reach + 18 * aura.x)
+                aura_y = int(reach + 18 * aura.y)
+                pygame.draw.circle(strip, (255,255,120), (aura_x, aura_y), 7)
+            # Draw fruit (shiny yellow with white highlight)
+            fruit_rect.center = center
+            pygame.draw.ellipse(strip, (255,255,0), fruit_rect)
+            pygame.draw.ellipse(strip, (255,255,180), fruit_rect.inflate(-8,-8))
+            pygame.draw.ellipse(strip, (255,255,255), fruit_rect.inflate(-16,-16))
+            frame_rects.append(frame_rect)
+        if pygame.display.get_surface() is not None:
+            strip = strip.convert_alpha()
+        Room.fruit_frames = strip
+        Room.fruit_frame_rects = frame_rects
+        Room.fruit_frames_size = fruit_size
+
     def draw_fruit(self, screen):
         if self.fruit_spawned and not self.fruit_collected and self.fruit_rect:
-            # Draw animated aura
+            # Blit the pre-rendered frame for the current aura angle
+            frame_rect = self.fruit_frame_rects[self.fruit_aura_angle // Room.FRUIT_AURA_STEP]
+            reach = Room.FRUIT_AURA_REACH
             center = self.fruit_rect.center
-            for i in range(8):
-                angle = self.fruit_aura_angle + i * (360 // 8)
-                rad = angle * 3.14159 / 180
-                aura_x = int(center[0] + 18 * pygame.math.Vector2(1,0).rotate(angle).x)
-                aura_y = int(center[1] + 18 * pygame.math.Vector2(1,0).rotate(angle).y)
-                pygame.draw.circle(screen, (255,255,120,120), (aura_x, aura_y), 7)
-            # Draw fruit (shiny yellow with white highlight)
-            pygame.draw.ellipse(screen, (255,255,0), self.fruit_rect)
-            pygame.draw.ellipse(screen, (255,255,180), self.fruit_rect.inflate(-8,-8))
-            pygame.draw.ellipse(screen, (255,255,255), self.fruit_rect.inflate(-16,-16))
-            self.fruit_aura_angle = (self.fruit_aura_angle + 4) % 360 
\ No newline at end of file
+            screen.blit(self.fruit_frames, (center[0] - reach, center[1] - reach), frame_rect)
+            # Aura dots reach 25px out from the center
+            dirty_rects.mark("fruit", self.fruit_rect.inflate(36, 36))
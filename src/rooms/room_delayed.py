@@ -1,17 +1,63 @@
 import pygame
+import random
+import struct
 from src.constants import *
+from src.fonts import render_text
+from src.dirty_rects import dirty_rects
 from src.rooms.room_base import Room
 
 class DelayedRoom(Room):
+    __slots__ = ("delay_line", "inputs_written", "delay_frames", "delay_jitter", "jitter_table")
+    # Snapshot state: inputs written so far, delay and jitter, then the line
+    DELAY_STATE = struct.Struct("<IHH")
+    JITTER_TABLE_SIZE = 256
+
     def __init__(self, player):
         super().__init__(player)
         self.room_name = "Time Lag Zone"
         self.hint_text = "Your actions seem to be on a delay... think ahead!"
         self.background_color = (40, 40, 60)  # Dark blue background
         
-        # Queue for storing delayed inputs
-        self.input_queue = []
+        # Delay line: ring of the last MAX_INPUT_DELAY + 1 action masks,
+        # written at inputs_written % its length
+        self.delay_line = bytearray(MAX_INPUT_DELAY + 1)
+        self.inputs_written = 0
         self.delay_frames = 30  # Half a second delay (at 60 FPS)
+        # Each tick's delay is delay_frames plus an offset of up to
+        # +-delay_jitter from a fixed table, so it stays deterministic
+        self.delay_jitter = 0
+        self.jitter_table = None
+        self.build_jitter_table()
+    
+    def build_jitter_table(self):
+        # Drawn from the room's own seed rather than the shared RNG, so the
+        # other rooms' seeds (and old replays) stay the same
+        rng = random.Random(self.platform_seed)
+        self.jitter_table = [rng.randrange(1 << 16) for _ in range(self.JITTER_TABLE_SIZE)]
+    
+    def reseed(self, rng):
+        super().reseed(rng)
+        self.build_jitter_table()
+    
+    def set_delay(self, frames, jitter=0):
+        # Change the delay at any time, queued inputs are kept. With jitter
+        # the delay wanders between frames - jitter and frames + jitter.
+        if frames < 0 or jitter < 0 or frames + jitter > MAX_INPUT_DELAY:
+            raise ValueError(f"Delay {frames}+-{jitter} is outside 0..{MAX_INPUT_DELAY} ticks")
+        self.delay_frames = frames
+        self.delay_jitter = jitter
+    
+    def current_delay(self):
+        # Delay for the input written last
+        if not self.delay_jitter:
+            return self.delay_frames
+        jitter = self.delay_jitter
+        offset = self.jitter_table[self.inputs_written % self.JITTER_TABLE_SIZE] % (2 * jitter + 1) - jitter
+        return max(0, self.delay_frames + offset)
+    
+    def queued_inputs(self):
+        # How many inputs are waiting to come out of the delay line
+        return min(self.inputs_written, self.delay_frames)
     
     def generate_layout(self):
         # Clear platforms
@@ -48,42 +94,57 @@ class DelayedRoom(Room):
         # Set initial position
         self.initial_position = (100, 400)
     
+    def pack_sim_state(self):
+        return (super().pack_sim_state()
+                + self.DELAY_STATE.pack(self.inputs_written, self.delay_frames, self.delay_jitter)
+                + self.delay_line)
+    
+    def unpack_sim_state(self, data, offset=0):
+        offset = super().unpack_sim_state(data, offset)
+        inputs_written, delay_frames, delay_jitter = self.DELAY_STATE.unpack_from(data, offset)
+        offset += self.DELAY_STATE.size
+        size = len(self.delay_line)
+        if len(data) < offset + size:
+            raise ValueError("Snapshot ends inside the delay line")
+        self.set_delay(delay_frames, delay_jitter)
+        self.inputs_written = inputs_written
+        self.delay_line[:] = data[offset:offset + size]
+        return offset + size
+    
+    def unpack_save_state(self, data, offset=0):
+        seed = self.platform_seed
+        offset = super().unpack_save_state(data, offset)
+        if self.platform_seed != seed:
+            self.build_jitter_table()
+        return offset
+    
     def handle_input(self, keys):
-        # Instead of directly applying inputs, add them to the queue
-        current_input = {
-            "left": any(keys[key] for key in self.control_scheme["left"]),
-            "right": any(keys[key] for key in self.control_scheme["right"]),
-            "jump": any(keys[key] for key in self.control_scheme["jump"])
-        }
-        
-        # Add the current input to the queue
-        self.input_queue.append(current_input)
+        # Instead of directly applying inputs, write this tick's actions into
+        # the delay line
+        line = self.delay_line
+        size = len(line)
+        line[self.inputs_written % size] = self.controls.actions(keys)
+        self.inputs_written += 1
         
-        # If we have enough inputs in the queue, process the oldest one
-        if len(self.input_queue) > self.delay_frames:
-            delayed_input = self.input_queue.pop(0)
-            
-            # Create a fake key state dictionary
-            fake_keys = {}
-            for action, key_list in self.control_scheme.items():
-                for key in key_list:
-                    fake_keys[key] = delayed_input[action]
-            
-            # Pass the delayed input to the player
-            self.player.handle_input(fake_keys, self.control_scheme)
+        # Apply the actions from delay ticks ago, or don't move until the
+        # line has filled that far
+        delay = self.current_delay()
+        if self.inputs_written > delay:
+            self.player.apply_actions(line[(self.inputs_written - 1 - delay) % size])
         else:
-            # If we don't have enough inputs yet, don't move
-            fake_keys = {key: False for action in self.control_scheme.values() for key in action}
-            self.player.handle_input(fake_keys, self.control_scheme)
+            self.player.apply_actions(0)
     
-    def draw(self, screen):
+    def draw_static(self, surface):
         # Draw the room using the base method
-        super().draw(screen)
+        super().draw_static(surface)
         
         # Draw some flavor text
-        font = pygame.font.Font(None, 24)
-        text = font.render("Is this place... lagging?", True, PINK_PASTEL)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
+        text = render_text("Is this place... lagging?", 24, PINK_PASTEL)
+        surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
+    
+    def draw_dynamic(self, screen):
+        # Draw fruit and player using the base method
+        super().draw_dynamic(screen)
         
         # Draw the input queue visualization
         self.draw_input_queue(screen)
@@ -99,13 +160,13 @@ class DelayedRoom(Room):
         pygame.draw.rect(screen, GRAY, (queue_x, queue_y, queue_width, queue_height))
         
         # Draw queue fill based on how full it is
-        fill_width = (len(self.input_queue) / self.delay_frames) * queue_width
+        fill_width = (self.queued_inputs() / self.delay_frames) * queue_width if self.delay_frames else queue_width
         pygame.draw.rect(screen, PINK_PASTEL, (queue_x, queue_y, fill_width, queue_height))
         
         # Draw queue border
         pygame.draw.rect(screen, WHITE, (queue_x, queue_y, queue_width, queue_height), 2)
         
         # Draw label
-        font = pygame.font.Font(None, 20)
-        label = font.render("???", True, WHITE)
-        screen.blit(label, (queue_x, queue_y - 20)) 
\ No newline at end of file
+        label = render_text("???", 20, WHITE)
+        screen.blit(label, (queue_x, queue_y - 20))
+        dirty_rects.mark("input_queue", (queue_x, queue_y - 20, queue_width, queue_height + 20)) 
\ No newline at end of file
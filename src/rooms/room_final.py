@@ -1,9 +1,47 @@
 import pygame
-import random
+import struct
 from src.constants import *
+from src.fonts import render_text
+from src.dirty_rects import dirty_rects
 from src.rooms.room_base import Room
 
 class FinalRoom(Room):
+    __slots__ = (
+        "zones", "current_zone", "zone_columns", "zone_rows", "zone_cells", "zone_column_count",
+        "input_queue", "delay_frames",
+        "momentum", "max_momentum", "momentum_increment", "friction",
+    )
+    # Platforms are flat gray over the zone colors
+    textured_platforms = False
+    # Snapshot state: momentum and the index of the zone we're in (-1 for none)
+    ZONE_STATE = struct.Struct("<db")
+    # Per-zone control schemes, built once instead of every tick
+    REVERSED_SCHEME = {
+        "left": [pygame.K_RIGHT, pygame.K_d],   # Pressing right moves left
+        "right": [pygame.K_LEFT, pygame.K_a],  # Pressing left moves right
+        "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
+    }
+    # Only F (left), H (right), T (jump) work
+    CUSTOM_SCHEME = {
+        "left": [pygame.K_f],
+        "right": [pygame.K_h],
+        "jump": [pygame.K_t]
+    }
+    # Control scheme per zone type (compiled once, set_control_scheme reuses
+    # the tables). The reversed zone swaps the held left/right keys before
+    # applying REVERSED_SCHEME, so the two swaps cancel out and it resolves
+    # like the normal keys.
+    ZONE_SCHEMES = {
+        "normal": Room.NORMAL_SCHEME,
+        "reversed": {
+            "left": REVERSED_SCHEME["right"],
+            "right": REVERSED_SCHEME["left"],
+            "jump": REVERSED_SCHEME["jump"],
+        },
+        "custom": CUSTOM_SCHEME,
+        "momentum": Room.NORMAL_SCHEME,
+    }
+
     def __init__(self, player):
         super().__init__(player)
         self.room_name = "Chaos Theory"
@@ -13,6 +51,12 @@ class FinalRoom(Room):
         # Control zone tracking
         self.zones = []
         self.current_zone = None
+        # Zone lookup table, built with the layout: screen column and row ->
+        # table column and row, and the index of the zone in each table cell
+        self.zone_columns = []
+        self.zone_rows = []
+        self.zone_cells = []
+        self.zone_column_count = 0
         
         # Delay queue for delayed controls section
         self.input_queue = []
@@ -51,6 +95,7 @@ class FinalRoom(Room):
                 "color": (50, 50, 30)
             }
         ]
+        self.build_zone_table()
         
         # Simple staircase path across all zones
         num_steps = 8
@@ -71,78 +116,85 @@ class FinalRoom(Room):
         # Set initial position
         self.initial_position = (x_start + 20, y_start - 20)
     
-    def get_current_zone(self):
-        # Determine which zone the player is in
-        player_center_x = self.player.x + self.player.width // 2
-        
+    def pack_sim_state(self):
+        zone = self.zones.index(self.current_zone) if self.current_zone in self.zones else -1
+        return super().pack_sim_state() + self.ZONE_STATE.pack(self.momentum, zone)
+    
+    def unpack_sim_state(self, data, offset=0):
+        offset = super().unpack_sim_state(data, offset)
+        self.momentum, zone = self.ZONE_STATE.unpack_from(data, offset)
+        self.current_zone = self.zones[zone] if zone >= 0 else None
+        if self.current_zone is not None and self.control_scheme is not self.current_zone["scheme"]:
+            self.set_control_scheme(self.current_zone["scheme"])
+        return offset + self.ZONE_STATE.size
+    
+    def build_zone_table(self):
+        # Cut the screen along every zone edge. Each resulting cell lies
+        # wholly inside or outside every zone, so looking a position up is
+        # three list indexes however many zones there are.
         for zone in self.zones:
-            if zone["rect"].collidepoint(player_center_x, self.player.y):
-                return zone
-        
-        # Default to normal controls if not in any zone
-        return self.zones[0]
+            zone["scheme"] = self.ZONE_SCHEMES[zone["type"]]
+        xs = {0}
+        ys = {0}
+        for zone in self.zones:
+            rect = zone["rect"]
+            xs.update(x for x in (rect.left, rect.right) if 0 < x < SCREEN_WIDTH)
+            ys.update(y for y in (rect.top, rect.bottom) if 0 < y < SCREEN_HEIGHT)
+        xs = sorted(xs) + [SCREEN_WIDTH]
+        ys = sorted(ys) + [SCREEN_HEIGHT]
+        self.zone_columns = [i for i in range(len(xs) - 1) for _ in range(xs[i + 1] - xs[i])]
+        self.zone_rows = [i for i in range(len(ys) - 1) for _ in range(ys[i + 1] - ys[i])]
+        columns = self.zone_column_count = len(xs) - 1
+        # Paint the zones in reverse so the first one listed wins, cells no
+        # zone covers stay normal (zone 0)
+        cells = [0] * (columns * (len(ys) - 1))
+        for index in range(len(self.zones) - 1, -1, -1):
+            rect = self.zones[index]["rect"].clip(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+            if not rect.width or not rect.height:
+                continue
+            left = self.zone_columns[rect.left]
+            right = self.zone_columns[rect.right - 1] + 1
+            for row in range(self.zone_rows[rect.top], self.zone_rows[rect.bottom - 1] + 1):
+                cells[row * columns + left:row * columns + right] = [index] * (right - left)
+        self.zone_cells = cells
+    
+    def find_zone(self, x, y):
+        # Index of the first zone containing the point, 0 (normal) if none
+        for i, zone in enumerate(self.zones):
+            if zone["rect"].collidepoint(x, y):
+                return i
+        return 0
+    
+    def get_current_zone(self):
+        # Determine which zone the player is in (positions are truncated
+        # like Rect.collidepoint does)
+        x = int(self.player.x + self.player.width // 2)
+        y = int(self.player.y)
+        if 0 <= x < SCREEN_WIDTH and 0 <= y < SCREEN_HEIGHT:
+            cell = self.zone_rows[y] * self.zone_column_count + self.zone_columns[x]
+            return self.zones[self.zone_cells[cell]]
+        # Off screen, ask the zones themselves
+        return self.zones[self.find_zone(x, y)]
     
     def handle_input(self, keys):
-        # Get the current zone
-        self.current_zone = self.get_current_zone()
-        zone_type = self.current_zone["type"]
+        # Get the current zone, its controls change with it
+        zone = self.get_current_zone()
+        if zone is not self.current_zone:
+            self.current_zone = zone
+            self.set_control_scheme(zone["scheme"])
+        actions = self.controls.actions(keys)
         
         # Handle input based on the current zone type
-        if zone_type == "normal":
-            self.handle_normal_input(keys)
-        elif zone_type == "reversed":
-            self.handle_reversed_input(keys)
-        elif zone_type == "custom":
-            self.handle_custom_input(keys)
-        elif zone_type == "momentum":
-            self.handle_momentum_input(keys)
-    
-    def handle_normal_input(self, keys):
-        # Normal controls
-        control_scheme = {
-            "left": [pygame.K_LEFT, pygame.K_a],
-            "right": [pygame.K_RIGHT, pygame.K_d],
-            "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
-        }
-        self.player.handle_input(keys, control_scheme)
-    
-    def handle_reversed_input(self, keys):
-        # True reversed controls: pressing left moves right, pressing right moves left
-        control_scheme = {
-            "left": [pygame.K_RIGHT, pygame.K_d],   # Pressing right moves left
-            "right": [pygame.K_LEFT, pygame.K_a],  # Pressing left moves right
-            "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
-        }
-        # Swap the actions: when left is pressed, move right; when right is pressed, move left
-        swapped_keys = {}
-        for key in control_scheme["left"]:
-            swapped_keys[key] = any(keys[k] for k in control_scheme["right"])
-        for key in control_scheme["right"]:
-            swapped_keys[key] = any(keys[k] for k in control_scheme["left"])
-        for key in control_scheme["jump"]:
-            swapped_keys[key] = keys[key]
-        self.player.handle_input(swapped_keys, control_scheme)
-    
-    def handle_custom_input(self, keys):
-        # Only F (left), H (right), T (jump) work
-        control_scheme = {
-            "left": [pygame.K_f],
-            "right": [pygame.K_h],
-            "jump": [pygame.K_t]
-        }
-        self.player.handle_input(keys, control_scheme)
+        if zone["type"] == "momentum":
+            self.handle_momentum_input(actions)
+        else:
+            self.player.apply_actions(actions)
     
-    def handle_momentum_input(self, keys):
+    def handle_momentum_input(self, actions):
         # Momentum-based controls
-        control_scheme = {
-            "left": [pygame.K_LEFT, pygame.K_a],
-            "right": [pygame.K_RIGHT, pygame.K_d],
-            "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]
-        }
-        
-        going_left = any(keys[key] for key in control_scheme["left"])
-        going_right = any(keys[key] for key in control_scheme["right"])
-        jumping = any(keys[key] for key in control_scheme["jump"])
+        going_left = actions & ACTION_LEFT
+        going_right = actions & ACTION_RIGHT
+        jumping = actions & ACTION_JUMP
         
         # Update momentum
         if going_left and not going_right:
@@ -168,7 +220,7 @@ class FinalRoom(Room):
         
         # Handle jumping
         if jumping and self.player.on_ground:
-            self.player.vel_y = JUMP_STRENGTH
+            self.player.vel_y = self.player.jump_strength
             self.player.on_ground = False
         
         # Update player facing
@@ -177,61 +229,59 @@ class FinalRoom(Room):
         elif self.momentum < 0:
             self.player.facing_right = False
     
-    def update(self):
+    def update(self, keys):
         # Update normal game logic
-        return super().update()
+        return super().update(keys)
     
-    def draw(self, screen):
+    def draw_static(self, surface):
         # Draw background with zone colors
         for zone in self.zones:
-            pygame.draw.rect(screen, zone["color"], zone["rect"])
+            pygame.draw.rect(surface, zone["color"], zone["rect"])
         
         # Draw zone dividers
         for i in range(1, len(self.zones)):
             x = i * SCREEN_WIDTH // 4
-            pygame.draw.line(screen, WHITE, (x, 0), (x, SCREEN_HEIGHT), 2)
+            pygame.draw.line(surface, WHITE, (x, 0), (x, SCREEN_HEIGHT), 2)
         
         # Draw platforms
         for platform in self.platforms:
-            pygame.draw.rect(screen, GRAY, platform)
+            pygame.draw.rect(surface, GRAY, platform)
         
         # Draw exit door
-        pygame.draw.rect(screen, PINK_PASTEL, self.exit_door)
+        pygame.draw.rect(surface, PINK_PASTEL, self.exit_door)
         
         # Draw door handle
         door_handle_x = self.exit_door.x + self.exit_door.width - 8
         door_handle_y = self.exit_door.y + self.exit_door.height // 2
-        pygame.draw.circle(screen, YELLOW_PASTEL, (door_handle_x, door_handle_y), 4)
+        pygame.draw.circle(surface, YELLOW_PASTEL, (door_handle_x, door_handle_y), 4)
         
         # Draw zone indicators (without explicit labels)
-        font = pygame.font.Font(None, 18)
         symbols = ["?", "?", "?", "?"] # Mystery symbols instead of explicit labels
         for i, symbol in enumerate(symbols):
             x = i * SCREEN_WIDTH // 4 + SCREEN_WIDTH // 8
             y = 50
-            text = font.render(symbol, True, WHITE)
-            screen.blit(text, (x - text.get_width() // 2, y))
+            text = render_text(symbol, 18, WHITE)
+            surface.blit(text, (x - text.get_width() // 2, y))
         
         # Draw room name
-        font = pygame.font.Font(None, 28)
-        name_text = font.render(self.room_name, True, LIGHT_GRAY)
-        screen.blit(name_text, (20, 20))
+        name_text = render_text(self.room_name, 28, LIGHT_GRAY)
+        surface.blit(name_text, (20, 20))
         
         # Draw flavor text
-        font = pygame.font.Font(None, 24)
-        text = font.render("What madness is this?! Everything keeps changing!", True, PINK_PASTEL)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
+        text = render_text("What madness is this?! Everything keeps changing!", 24, PINK_PASTEL)
+        surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
         
-        # Draw player
-        self.player.draw(screen)
+    def draw_dynamic(self, screen):
+        # Draw fruit and player using the base method
+        super().draw_dynamic(screen)
         
         # Draw current zone indicator (but more mysterious)
         if self.current_zone:
             zone_name = "???"
-            indicator = font.render(f"Zone: {zone_name}", True, PINK_PASTEL)
-            screen.blit(indicator, (SCREEN_WIDTH - indicator.get_width() - 20, 20))
+            indicator = render_text(f"Zone: {zone_name}", 24, PINK_PASTEL)
+            dirty_rects.mark("zone", screen.blit(indicator, (SCREEN_WIDTH - indicator.get_width() - 20, 20)))
         
         # Draw hint if revealed
         if self.hint_revealed:
-            hint_text = font.render(self.hint_text, True, WHITE)
-            screen.blit(hint_text, (10, SCREEN_HEIGHT - 30)) 
\ No newline at end of file
+            hint_text = render_text(self.hint_text, 24, WHITE)
+            dirty_rects.mark("room_hint", screen.blit(hint_text, (10, SCREEN_HEIGHT - 30))) 
\ No newline at end of file
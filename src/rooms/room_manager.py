@@ -1,5 +1,8 @@
 import pygame
+import random
+import struct
 from src.constants import *
+from src.savestate import pack_rng, unpack_rng
 from src.rooms.room_normal import NormalRoom
 from src.rooms.room_reversed import ReversedRoom
 from src.rooms.room_delayed import DelayedRoom
@@ -9,8 +12,13 @@ from src.rooms.room_gravity import GravityRoom
 from src.rooms.room_final import FinalRoom
 
 class RoomManager:
-    def __init__(self, player):
+    # Savestate header: current room and whether room 1 has lost its door
+    SAVE_STATE = struct.Struct("<B?")
+
+    def __init__(self, player, seed=None):
         self.player = player
+        # Every room's random choices come from this, so a seed replays exactly
+        self.rng = random.Random(seed)
         self.current_room_index = 0
         
         # Quirky transition messages
@@ -35,6 +43,9 @@ class RoomManager:
             FinalRoom(player)             # Room 7: Final challenge combining mechanics
         ]
         
+        for room in self.rooms:
+            room.reseed(self.rng)
+        
         # Initialize the first room
         self.current_room = self.rooms[self.current_room_index]
         self.current_room.enter()
@@ -42,9 +53,9 @@ class RoomManager:
     def handle_event(self, event):
         self.current_room.handle_event(event)
     
-    def update(self):
-        # Update the current room
-        room_completed = self.current_room.update()
+    def update(self, keys):
+        # Update the current room with this tick's keys
+        room_completed = self.current_room.update(keys)
         
         # Return completion status and transition message
         if room_completed:
@@ -52,6 +63,36 @@ class RoomManager:
         
         return False, ""
     
+    def pack_sim_state(self):
+        # Snapshot of the current room and the player in it
+        return bytes((self.current_room_index,)) + self.player.pack_sim_state() + self.current_room.pack_sim_state()
+    
+    def unpack_sim_state(self, data):
+        # Only snapshots of the room we're in can be restored
+        if data[0] != self.current_room_index:
+            return False
+        offset = self.player.unpack_sim_state(data, 1)
+        self.current_room.unpack_sim_state(data, offset)
+        return True
+    
+    def pack_save_state(self):
+        data = [self.SAVE_STATE.pack(self.current_room_index, self.rooms[0].hide_door),
+                pack_rng(self.rng), self.player.pack_save_state()]
+        data.extend(room.pack_save_state() for room in self.rooms)
+        return b"".join(data)
+    
+    def unpack_save_state(self, data, offset=0):
+        index, hide_door = self.SAVE_STATE.unpack_from(data, offset)
+        offset = unpack_rng(self.rng, data, offset + self.SAVE_STATE.size)
+        if self.rooms[0].hide_door != hide_door:
+            self.rooms[0] = NormalRoom(self.player, hide_door=hide_door)
+        self.current_room_index = index
+        self.current_room = self.rooms[index]
+        offset = self.player.unpack_save_state(data, offset)
+        for room in self.rooms:
+            offset = room.unpack_save_state(data, offset)
+        return offset
+    
     def next_room(self):
         # Increment the room index
         self.current_room_index = (self.current_room_index + 1) % len(self.rooms)
@@ -60,6 +101,9 @@ class RoomManager:
         self.current_room = self.rooms[self.current_room_index]
         self.current_room.enter()
     
+    def set_backdrop(self, backdrop):
+        self.current_room.set_backdrop(backdrop)
+    
     def draw(self, screen):
         # Draw the current room
         self.current_room.draw(screen)
@@ -71,6 +115,7 @@ class RoomManager:
     def reset_first_room_no_door(self):
         # Replace the first room with a version that has no door
         self.rooms[0] = NormalRoom(self.player, hide_door=True)
+        self.rooms[0].reseed(self.rng)
         self.current_room_index = 0
         self.current_room = self.rooms[0]
         self.current_room.enter() 
\ No newline at end of file
@@ -1,8 +1,16 @@
 import pygame
+import struct
 from src.constants import *
+from src.fonts import render_text
+from src.dirty_rects import dirty_rects
 from src.rooms.room_base import Room
 
 class MomentumRoom(Room):
+    __slots__ = ("momentum", "max_momentum", "momentum_increment", "friction")
+    MOMENTUM_STATE = struct.Struct("<d")
+    # The ice overlay covers every platform completely
+    textured_platforms = False
+
     def __init__(self, player):
         super().__init__(player)
         self.room_name = "Slippery Slide"
@@ -33,11 +41,20 @@ class MomentumRoom(Room):
         # Set initial position at bottom left
         self.initial_position = (30, 520)
     
+    def pack_sim_state(self):
+        return super().pack_sim_state() + self.MOMENTUM_STATE.pack(self.momentum)
+    
+    def unpack_sim_state(self, data, offset=0):
+        offset = super().unpack_sim_state(data, offset)
+        self.momentum, = self.MOMENTUM_STATE.unpack_from(data, offset)
+        return offset + self.MOMENTUM_STATE.size
+    
     def handle_input(self, keys):
         # Instead of directly moving, adjust momentum
-        going_left = any(keys[key] for key in self.control_scheme["left"])
-        going_right = any(keys[key] for key in self.control_scheme["right"])
-        jumping = any(keys[key] for key in self.control_scheme["jump"])
+        actions = self.controls.actions(keys)
+        going_left = actions & ACTION_LEFT
+        going_right = actions & ACTION_RIGHT
+        jumping = actions & ACTION_JUMP
         
         # Update momentum based on input
         if going_left and not going_right:
@@ -63,7 +80,7 @@ class MomentumRoom(Room):
         
         # Handle jumping (this stays the same)
         if jumping and self.player.on_ground:
-            self.player.vel_y = JUMP_STRENGTH
+            self.player.vel_y = self.player.jump_strength
             self.player.on_ground = False
         
         # Update player facing direction based on momentum
@@ -72,27 +89,27 @@ class MomentumRoom(Room):
         elif self.momentum < 0:
             self.player.facing_right = False
     
-    def draw(self, screen):
+    def draw_static(self, surface):
         # Draw the room using the base method
-        super().draw(screen)
+        super().draw_static(surface)
         
         # Draw some flavor text
-        font = pygame.font.Font(None, 24)
-        text = font.render("Whoa... what's with all this ice?!", True, BLUE_PASTEL)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
+        text = render_text("Whoa... what's with all this ice?!", 24, BLUE_PASTEL)
+        surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
         
         # Draw platforms with ice-like appearance
         for platform in self.platforms:
             # Draw ice overlay
             ice_rect = platform.copy()
-            pygame.draw.rect(screen, BLUE_PASTEL, ice_rect)
+            pygame.draw.rect(surface, BLUE_PASTEL, ice_rect)
             
             # Draw ice shine
             shine_rect = pygame.Rect(ice_rect.x + 5, ice_rect.y + 5, 10, 3)
-            pygame.draw.rect(screen, WHITE, shine_rect)
-        
-        # Redraw the player (since we drew over it)
-        self.player.draw(screen)
+            pygame.draw.rect(surface, WHITE, shine_rect)
+    
+    def draw_dynamic(self, screen):
+        # Draw fruit and player using the base method (on top of the ice)
+        super().draw_dynamic(screen)
         
         # Draw momentum indicator
         self.draw_momentum_indicator(screen)
@@ -124,6 +141,6 @@ class MomentumRoom(Room):
         pygame.draw.rect(screen, WHITE, (indicator_x, indicator_y, indicator_width, indicator_height), 2)
         
         # Draw label
-        font = pygame.font.Font(None, 20)
-        label = font.render("Slidey-ness", True, WHITE)
-        screen.blit(label, (indicator_x, indicator_y - 20)) 
\ No newline at end of file
+        label = render_text("Slidey-ness", 20, WHITE)
+        screen.blit(label, (indicator_x, indicator_y - 20))
+        dirty_rects.mark("momentum", (indicator_x, indicator_y - 20, indicator_width, indicator_height + 20)) 
\ No newline at end of file
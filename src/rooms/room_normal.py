@@ -1,8 +1,11 @@
 import pygame
 from src.constants import *
+from src.fonts import render_text
 from src.rooms.room_base import Room
 
 class NormalRoom(Room):
+    __slots__ = ("hide_door",)
+
     def __init__(self, player, hide_door=False):
         super().__init__(player)
         self.room_name = "The First Step"
@@ -41,12 +44,11 @@ class NormalRoom(Room):
         # Set initial position
         self.initial_position = (100, 300)
     
-    def draw(self, screen):
+    def draw_static(self, surface):
         # Draw the room using the base method
-        super().draw(screen)
+        super().draw_static(surface)
         
         # Draw some welcome text (more quirky)
-        font = pygame.font.Font(None, 24)
         instructions = [
             "Wait, where am I?",
             "That door looks interesting...",
@@ -55,6 +57,6 @@ class NormalRoom(Room):
         
         y_pos = 70
         for line in instructions:
-            text = font.render(line, True, LIGHT_GRAY)
-            screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_pos))
+            text = render_text(line, 24, LIGHT_GRAY)
+            surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_pos))
             y_pos += 30 
\ No newline at end of file
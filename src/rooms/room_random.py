@@ -1,9 +1,21 @@
 import pygame
 import random
+import struct
 from src.constants import *
+from src.fonts import render_text
+from src.dirty_rects import dirty_rects
 from src.rooms.room_base import Room
 
 class RandomRoom(Room):
+    __slots__ = ("available_keys", "control_display", "randomize_timer", "randomize_interval",
+                 "rng", "rng_seed", "shuffle_count")
+    # Snapshot state: randomize timer and how many shuffles led to the mapping
+    CONTROLS_STATE = struct.Struct("<II")
+    # Savestates add the shuffle seed (if reseeded)
+    SEED_STATE = struct.Struct("<?I")
+    # Most shuffles a snapshot may ask to replay (a week in this room)
+    MAX_SHUFFLES = 1 << 16
+
     def __init__(self, player):
         super().__init__(player)
         self.room_name = "Chaos Chamber"
@@ -17,6 +29,12 @@ class RandomRoom(Room):
             pygame.K_SPACE, pygame.K_q, pygame.K_e
         ]
         
+        # Own RNG for the shuffles, seeded by reseed(). The mapping is fully
+        # decided by the seed and the number of shuffles since.
+        self.rng = random.Random()
+        self.rng_seed = None
+        self.shuffle_count = 0
+        
         # Initialize control display first
         self.control_display = {
             "left": "",
@@ -33,14 +51,15 @@ class RandomRoom(Room):
     
     def randomize_controls(self):
         # Shuffle the available keys
-        random.shuffle(self.available_keys)
+        self.rng.shuffle(self.available_keys)
+        self.shuffle_count += 1
         
         # Assign the first 3 keys to left, right, and jump
-        self.control_scheme = {
+        self.set_control_scheme({
             "left": [self.available_keys[0]],
             "right": [self.available_keys[1]],
             "jump": [self.available_keys[2]]
-        }
+        })
         
         # Update control display
         self.control_display = {
@@ -49,6 +68,45 @@ class RandomRoom(Room):
             "jump": pygame.key.name(self.available_keys[2])
         }
     
+    def reseed(self, rng):
+        super().reseed(rng)
+        self.rng_seed = rng.getrandbits(32)
+        self.restore_shuffles(0)
+    
+    def restore_shuffles(self, count):
+        # Rebuild the mapping after count shuffles from the seed. Start from a
+        # known key order so a seed always gives the same shuffles.
+        self.available_keys.sort()
+        self.rng.seed(self.rng_seed)
+        self.shuffle_count = 0
+        for _ in range(count):
+            self.randomize_controls()
+    
+    def pack_sim_state(self):
+        return super().pack_sim_state() + self.CONTROLS_STATE.pack(self.randomize_timer, self.shuffle_count)
+    
+    def pack_save_state(self):
+        seed = self.SEED_STATE.pack(self.rng_seed is not None, self.rng_seed or 0)
+        return seed + super().pack_save_state()
+    
+    def unpack_save_state(self, data, offset=0):
+        has_seed, seed = self.SEED_STATE.unpack_from(data, offset)
+        seed = seed if has_seed else None
+        if seed != self.rng_seed:
+            # The mapping came from another seed, rebuild it from this one
+            self.rng_seed = seed
+            self.shuffle_count = -1
+        return super().unpack_save_state(data, offset + self.SEED_STATE.size)
+    
+    def unpack_sim_state(self, data, offset=0):
+        offset = super().unpack_sim_state(data, offset)
+        self.randomize_timer, shuffle_count = self.CONTROLS_STATE.unpack_from(data, offset)
+        if shuffle_count > self.MAX_SHUFFLES:
+            raise ValueError(f"Implausible shuffle count {shuffle_count}")
+        if shuffle_count != self.shuffle_count:
+            self.restore_shuffles(shuffle_count)
+        return offset + self.CONTROLS_STATE.size
+    
     def enter(self):
         # Make sure we initialize controls when entering the room
         super().enter()
@@ -84,7 +142,7 @@ class RandomRoom(Room):
         # Set initial position
         self.initial_position = (70, 470)
     
-    def update(self):
+    def update(self, keys):
         # Update randomize timer
         self.randomize_timer += 1
         if self.randomize_timer >= self.randomize_interval:
@@ -92,16 +150,19 @@ class RandomRoom(Room):
             self.randomize_controls()
         
         # Call the base update method
-        return super().update()
+        return super().update(keys)
     
-    def draw(self, screen):
+    def draw_static(self, surface):
         # Draw the room using the base method
-        super().draw(screen)
+        super().draw_static(surface)
         
         # Draw some flavor text
-        font = pygame.font.Font(None, 24)
-        text = font.render("What key does what now? So confusing!", True, PINK_PASTEL)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
+        text = render_text("What key does what now? So confusing!", 24, PINK_PASTEL)
+        surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70))
+    
+    def draw_dynamic(self, screen):
+        # Draw fruit and player using the base method
+        super().draw_dynamic(screen)
         
         # Draw the current control scheme
         self.draw_control_scheme(screen)
@@ -110,8 +171,6 @@ class RandomRoom(Room):
         self.draw_randomize_timer(screen)
     
     def draw_control_scheme(self, screen):
-        font = pygame.font.Font(None, 20)
-        
         # Draw control labels
         control_x = 20
         control_y = 100
@@ -122,8 +181,8 @@ class RandomRoom(Room):
         ]
         
         for i, control in enumerate(controls):
-            text = font.render(control, True, WHITE)
-            screen.blit(text, (control_x, control_y + i * 20))
+            text = render_text(control, 20, WHITE)
+            dirty_rects.mark(("control_scheme", i), screen.blit(text, (control_x, control_y + i * 20)))
     
     def draw_randomize_timer(self, screen):
         # Draw a visual representation of time until next randomization
@@ -143,6 +202,6 @@ class RandomRoom(Room):
         pygame.draw.rect(screen, WHITE, (timer_x, timer_y, timer_width, timer_height), 1)
         
         # Draw label
-        font = pygame.font.Font(None, 18)
-        label = font.render("????? in:", True, WHITE)
-        screen.blit(label, (timer_x, timer_y - 20)) 
\ No newline at end of file
+        label = render_text("????? in:", 18, WHITE)
+        screen.blit(label, (timer_x, timer_y - 20))
+        dirty_rects.mark("randomize_timer", (timer_x, timer_y - 20, timer_width, timer_height + 20)) 
\ No newline at end of file
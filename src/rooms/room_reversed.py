@@ -1,8 +1,11 @@
 import pygame
 from src.constants import *
+from src.fonts import render_text
 from src.rooms.room_base import Room
 
 class ReversedRoom(Room):
+    __slots__ = ()
+
     def __init__(self, player):
         super().__init__(player)
         self.room_name = "Mirror Maze"
@@ -10,11 +13,11 @@ class ReversedRoom(Room):
         self.background_color = (40, 20, 40)  # Purple-ish background
         
         # Reversed left/right controls
-        self.control_scheme = {
+        self.set_control_scheme({
             "left": [pygame.K_RIGHT, pygame.K_d],  # Reversed!
             "right": [pygame.K_LEFT, pygame.K_a],  # Reversed!
             "jump": [pygame.K_UP, pygame.K_w, pygame.K_SPACE]  # Jump is the same
-        }
+        })
     
     def generate_layout(self):
         # Clear platforms
@@ -49,11 +52,10 @@ class ReversedRoom(Room):
         # Set initial position
         self.initial_position = (150, 300)
     
-    def draw(self, screen):
+    def draw_static(self, surface):
         # Draw the room using the base method
-        super().draw(screen)
+        super().draw_static(surface)
         
         # Draw some flavor text (more mysterious)
-        font = pygame.font.Font(None, 24)
-        text = font.render("Something feels... backwards?", True, PINK_PASTEL)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70)) 
\ No newline at end of file
+        text = render_text("Something feels... backwards?", 24, PINK_PASTEL)
+        surface.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 70)) 
\ No newline at end of file
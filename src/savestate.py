@@ -0,0 +1,64 @@
+import struct
+import zlib
+
+# File layout: MAGIC, VERSION, the length and CRC-32 of the payload, then
+# the payload, Game.pack_save_state(). Each object packs its fields with
+# struct and appends its children's data after them, and
+# unpack_save_state(data, offset) reads them back in the same order,
+# returning the offset after its part.
+MAGIC = b"CSSV"
+VERSION = 3
+HEADER = struct.Struct("<4sHII")
+# random.Random state: version, 624 Mersenne Twister words + index, gauss_next
+RNG_STATE = struct.Struct("<I625I?d")
+
+def pack_string(text):
+    data = text.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+def unpack_string(data, offset):
+    length, = struct.unpack_from("<H", data, offset)
+    offset += 2
+    return data[offset:offset + length].decode("utf-8"), offset + length
+
+def pack_rng(rng):
+    version, internal, gauss_next = rng.getstate()
+    return RNG_STATE.pack(version, *internal, gauss_next is not None, gauss_next or 0.0)
+
+def unpack_rng(rng, data, offset):
+    values = RNG_STATE.unpack_from(data, offset)
+    rng.setstate((values[0], values[1:626], values[627] if values[626] else None))
+    return offset + RNG_STATE.size
+
+def dumps(game):
+    payload = game.pack_save_state()
+    return HEADER.pack(MAGIC, VERSION, len(payload), zlib.crc32(payload)) + payload
+
+def loads(game, data):
+    # The header, length and checksum are all checked before anything is
+    # touched, so a truncated or damaged savestate leaves the game as it was
+    if len(data) < HEADER.size:
+        raise ValueError("Not a savestate")
+    magic, version, length, crc = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a savestate")
+    if version != VERSION:
+        raise ValueError(f"Savestate version {version} can't be loaded (expected {VERSION})")
+    if len(data) != HEADER.size + length:
+        raise ValueError(f"Savestate is {len(data) - HEADER.size} bytes, expected {length}")
+    if zlib.crc32(memoryview(data)[HEADER.size:]) != crc:
+        raise ValueError("Savestate checksum doesn't match, the file is damaged")
+    try:
+        end = game.unpack_save_state(data, HEADER.size)
+    except Exception as e:
+        raise ValueError(f"Corrupt savestate: {e!r}") from e
+    if end != len(data):
+        raise ValueError(f"Corrupt savestate: {len(data) - end} unexpected bytes at the end")
+
+def save(game, path):
+    with open(path, "wb") as f:
+        f.write(dumps(game))
+
+def load(game, path):
+    with open(path, "rb") as f:
+        loads(game, f.read())
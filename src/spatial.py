@@ -0,0 +1,87 @@
+from src.constants import *
+
+class SpatialGrid:
+    # Uniform grid of TILE_SIZE cells over a set of rects. Queries only look at
+    # the cells a rect covers, so their cost doesn't grow with the room size.
+    def __init__(self, rects=(), cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # Rects in insertion order (None once removed), queries keep this order
+        self.items = []
+        # Reused query buffers: results are only valid until the next query
+        self.results = []
+        self.hits = []
+        self.found = []
+        self.stamps = []
+        self.stamp = 0
+        for rect in rects:
+            self.insert(rect)
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (rect.left // size, (rect.right - 1) // size,
+                rect.top // size, (rect.bottom - 1) // size)
+
+    def insert(self, rect):
+        # Returns a handle that can be passed to remove()
+        handle = len(self.items)
+        self.items.append(rect)
+        self.stamps.append(0)
+        left, right, top, bottom = self.cell_range(rect)
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                self.cells.setdefault((cx, cy), []).append(handle)
+        return handle
+
+    def remove(self, handle):
+        rect = self.items[handle]
+        if rect is None:
+            return
+        left, right, top, bottom = self.cell_range(rect)
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                self.cells[(cx, cy)].remove(handle)
+        self.items[handle] = None
+
+    def query(self, rect):
+        # Every rect sharing a cell with the given rect, in insertion order.
+        # The returned list is reused by the next query on this grid.
+        left, right, top, bottom = self.cell_range(rect)
+        cells = self.cells
+        found = self.found
+        found.clear()
+        if left == right and top == bottom:
+            found.extend(cells.get((left, top), ()))
+        else:
+            # Stamp handles as we see them so each is only collected once
+            self.stamp += 1
+            stamp = self.stamp
+            stamps = self.stamps
+            for cy in range(top, bottom + 1):
+                for cx in range(left, right + 1):
+                    for handle in cells.get((cx, cy), ()):
+                        if stamps[handle] != stamp:
+                            stamps[handle] = stamp
+                            found.append(handle)
+            found.sort()
+        items = self.items
+        results = self.results
+        results.clear()
+        for handle in found:
+            results.append(items[handle])
+        return results
+
+    def colliding(self, rect):
+        # Only the rects that actually overlap the given rect (also reused)
+        hits = self.hits
+        hits.clear()
+        for other in self.query(rect):
+            if rect.colliderect(other):
+                hits.append(other)
+        return hits
+
+    def __iter__(self):
+        return (rect for rect in self.items if rect is not None)
+
+    def __len__(self):
+        return sum(1 for rect in self.items if rect is not None)
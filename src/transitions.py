@@ -0,0 +1,67 @@
+import pygame
+from src.constants import *
+
+class Effect:
+    # Base for full-screen transition effects, never used on its own. Each
+    # effect allocates its surfaces once; a frame only changes an alpha
+    # value or an offset.
+    def __init__(self, duration):
+        self.duration = duration
+        self.timer = duration  # Finished until started
+
+    def start(self):
+        self.timer = 0
+
+    def update(self):
+        if self.timer < self.duration:
+            self.timer += 1
+
+    def is_active(self):
+        return self.timer < self.duration
+
+    def draw(self, screen):
+        # Subclasses provide render(screen, progress), progress going from
+        # 0 to 1 over the effect
+        if self.is_active():
+            self.render(screen, self.timer / self.duration)
+
+class Fade(Effect):
+    # Fade the screen out to a solid color
+    def __init__(self, duration, color=BLACK):
+        super().__init__(duration)
+        self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.overlay.fill(color)
+
+    def render(self, screen, progress):
+        self.overlay.set_alpha(int(255 * progress))
+        screen.blit(self.overlay, (0, 0))
+
+class CrossFade(Effect):
+    # Fade from a snapshot of the outgoing screen to whatever is drawn now
+    def __init__(self, duration):
+        super().__init__(duration)
+        self.snapshot = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+
+    def capture(self, screen):
+        # Copy the outgoing frame into the persistent snapshot and start
+        self.snapshot.blit(screen, (0, 0))
+        self.start()
+
+    def render(self, screen, progress):
+        self.snapshot.set_alpha(int(255 * (1 - progress)))
+        screen.blit(self.snapshot, (0, 0))
+
+class Wipe(CrossFade):
+    # Slide the outgoing snapshot off to the left, revealing the new screen
+    def render(self, screen, progress):
+        offset = int(SCREEN_WIDTH * progress)
+        self.snapshot.set_alpha(None)
+        screen.blit(self.snapshot, (-offset, 0))
+
+def create_room_transition():
+    # Effect used between rooms, picked by ROOM_TRANSITION_EFFECT
+    if ROOM_TRANSITION_EFFECT == "wipe":
+        return Wipe(ROOM_TRANSITION_FRAMES)
+    if ROOM_TRANSITION_EFFECT == "crossfade":
+        return CrossFade(ROOM_TRANSITION_FRAMES)
+    return CrossFade(0)  # "none": never active
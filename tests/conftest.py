@@ -0,0 +1,30 @@
+import os
+import sys
+
+# Everything runs on SDL's dummy drivers, set before pygame is initialised
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import pygame
+import pytest
+from src.input import KEY_BITS
+
+@pytest.fixture(scope="session", autouse=True)
+def pygame_display():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    yield
+    pygame.quit()
+
+def random_masks(seed, ticks, hold=(5, 60)):
+    # Random tracked keys (never R, which rewinds), each combination held for
+    # a random number of ticks in the hold range
+    rng = random.Random(seed)
+    bits = [bit for key, bit in KEY_BITS.items() if key != pygame.K_r]
+    masks = []
+    while len(masks) < ticks:
+        mask = sum(bit for bit in bits if rng.random() < 0.25)
+        masks += [mask] * rng.randint(*hold)
+    return masks[:ticks]
@@ -0,0 +1,26 @@
+from src.game import Game
+from src.input import NO_KEYS
+
+def test_animation_counters_follow_ticks_not_frames():
+    game = Game(headless=True, seed=1)
+    game.start_room(0)
+    room = game.room_manager.current_room
+    room.fruit_timer = room.fruit_duration
+    game.step(NO_KEYS)
+    assert room.fruit_spawned
+    angle = room.fruit_aura_angle
+    for _ in range(3):
+        game.draw()
+    assert room.fruit_aura_angle == angle
+    game.step(NO_KEYS)
+    assert room.fruit_aura_angle == (angle + room.FRUIT_AURA_STEP) % 360
+
+    game.transition_to_next_room("next")
+    glitch = game.narrator.glitch_index
+    counter = game.transition_counter
+    for _ in range(3):
+        game.draw()
+    assert (game.narrator.glitch_index, game.transition_counter) == (glitch, counter)
+    game.step(NO_KEYS)
+    assert game.narrator.glitch_index == (glitch + 1) % game.narrator.GLITCH_TABLE_SIZE
+    assert game.transition_counter == counter + 1
@@ -0,0 +1,54 @@
+import pytest
+from src.input import KeyState, KEY_BITS
+from src.player import Player
+from src.rooms.room_manager import RoomManager
+
+np = pytest.importorskip("numpy")
+from src.batch_sim import BatchSimulator
+
+PLAYERS = 12
+TICKS = 1200
+
+def make_room(room_type, player, control_scheme):
+    room = room_type(player)
+    # The first enter() places the player before the layout exists
+    room.enter()
+    room.enter()
+    room.set_control_scheme(control_scheme)
+    room.fruit_duration = 10 ** 9
+    if hasattr(room, "randomize_interval"):
+        room.randomize_interval = 10 ** 9
+    return room
+
+@pytest.mark.parametrize("index", range(6))
+def test_batch_matches_scalar_rooms(index):
+    manager = RoomManager(Player(), 1234)
+    template = manager.rooms[index]
+    template.enter()
+    template.enter()
+    sim = BatchSimulator(template, PLAYERS)
+    # Held key patterns that change every few ticks
+    rng = np.random.default_rng(index)
+    presses = np.zeros((TICKS, PLAYERS, len(sim.keys)), bool)
+    for n in range(PLAYERS):
+        t = 0
+        while t < TICKS:
+            length = rng.integers(1, 40)
+            presses[t:t + length, n] = rng.random(len(sim.keys)) < 0.35
+            t += length
+    for t in range(TICKS):
+        sim.step(presses[t])
+
+    for n in range(PLAYERS):
+        player = Player()
+        room = make_room(type(template), player, template.control_scheme)
+        finished = -1
+        for t in range(TICKS):
+            keys = KeyState(sum(KEY_BITS[key] for j, key in enumerate(sim.keys) if presses[t, n, j]))
+            player.begin_tick()
+            if room.update(keys):
+                finished = t
+                break
+        assert finished == sim.finished[n]
+        assert (player.x, player.y, player.vel_y, player.on_ground) == \
+            (sim.x[n], sim.y[n], sim.vel_y[n], sim.on_ground[n])
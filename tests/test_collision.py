@@ -0,0 +1,31 @@
+import random
+import pygame
+from src.constants import *
+from src.player import Player
+from src.spatial import SpatialGrid
+
+def test_fast_fall_lands_instead_of_tunnelling():
+    platform = pygame.Rect(100, 400, 200, TILE_SIZE)
+    grid = SpatialGrid([platform])
+    player = Player()
+    player.place((150, 300))
+    player.vel_y = 250
+    player.update(grid)
+    assert player.on_ground
+    assert player.get_rect().bottom == platform.top
+
+def test_moving_never_ends_inside_a_platform():
+    rng = random.Random(2)
+    platforms = [pygame.Rect(rng.randrange(0, 760), rng.randrange(0, 580), rng.randrange(8, 160), TILE_SIZE)
+                 for _ in range(25)]
+    grid = SpatialGrid(platforms)
+    player = Player()
+    for _ in range(3000):
+        player.place((rng.uniform(0, 770), rng.uniform(0, 560)))
+        if player.get_rect().collidelist(platforms) != -1:
+            continue
+        player.vel_x = rng.uniform(-60, 60)
+        player.vel_y = rng.uniform(-60, 60)
+        player.on_ground = False
+        player.update(grid)
+        assert player.get_rect().collidelist(platforms) == -1
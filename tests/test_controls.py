@@ -0,0 +1,60 @@
+import random
+import pygame
+from src.constants import *
+from src.controls import ControlScheme
+from src.input import KeyState, KEY_BITS, TRACKED_KEYS
+from src.player import Player
+from src.rooms.room_final import FinalRoom
+
+def test_compiled_scheme_matches_key_lists():
+    rng = random.Random(0)
+    for _ in range(50):
+        keys = rng.sample(TRACKED_KEYS, 6)
+        scheme = {"left": keys[:2], "right": keys[2:4], "jump": keys[4:]}
+        controls = ControlScheme.compile(scheme)
+        for mask in range(0, 1 << 16, 37):
+            state = KeyState(mask)
+            expected = ((ACTION_LEFT if any(state[key] for key in scheme["left"]) else 0)
+                        | (ACTION_RIGHT if any(state[key] for key in scheme["right"]) else 0)
+                        | (ACTION_JUMP if any(state[key] for key in scheme["jump"]) else 0))
+            assert controls.actions(state) == expected
+
+def scan_zone(room):
+    # What get_current_zone did before the lookup table
+    x = room.player.x + room.player.width // 2
+    for zone in room.zones:
+        if zone["rect"].collidepoint(x, room.player.y):
+            return zone
+    return room.zones[0]
+
+def test_zone_table_matches_scan():
+    player = Player()
+    room = FinalRoom(player)
+    room.enter()
+    rng = random.Random(5)
+    layouts = [room.zones]
+    for _ in range(5):
+        layouts.append([{"rect": pygame.Rect(rng.randrange(-50, 800), rng.randrange(-50, 600),
+                                             rng.randrange(1, 120), rng.randrange(1, 120)),
+                         "type": rng.choice(list(FinalRoom.ZONE_SCHEMES)), "color": BLACK}
+                        for _ in range(60)])
+    for zones in layouts:
+        room.zones = zones
+        room.build_zone_table()
+        for _ in range(20000):
+            player.x = rng.uniform(-60, 860)
+            player.y = rng.uniform(-80, 700)
+            if rng.random() < 0.3:
+                player.x, player.y = float(int(player.x)), float(int(player.y))
+            assert room.get_current_zone() is scan_zone(room)
+
+def test_zone_change_keeps_control_scheme_in_sync():
+    player = Player()
+    room = FinalRoom(player)
+    room.enter()
+    for zone in room.zones:
+        player.x = zone["rect"].centerx - player.width // 2
+        player.y = zone["rect"].centery
+        room.handle_input(KeyState(0))
+        assert room.control_scheme is zone["scheme"]
+        assert room.controls is ControlScheme.compile(room.control_scheme)
@@ -0,0 +1,15 @@
+import pygame
+import pytest
+from src.constants import *
+from src.display import Display
+
+@pytest.mark.parametrize("size", [(640, 480), (300, 1000), (801, 599), (800, 600), (1700, 1250)])
+def test_any_window_size_presents(size):
+    display = Display()
+    display.resize(size)
+    window = pygame.Rect((0, 0), display.window.get_size())
+    assert window.contains(display.view_rect)
+    display.framebuffer.fill(WHITE)
+    display.present()
+    display.present([pygame.Rect(0, 0, 10, 10)])
+    assert display.window.get_at(display.view_rect.center)[:3] == WHITE
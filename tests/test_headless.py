@@ -0,0 +1,13 @@
+import os
+import pygame
+from src.game import Game
+
+def test_headless_restarts_a_real_display_driver():
+    # e.g. python -m src.replay, where pygame may be initialised first
+    pygame.display.quit()
+    os.environ["SDL_VIDEODRIVER"] = "offscreen"
+    pygame.display.init()
+    assert pygame.display.get_driver() == "offscreen"
+    game = Game(headless=True)
+    assert pygame.display.get_driver() == "dummy"
+    game.step(0)
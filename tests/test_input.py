@@ -0,0 +1,44 @@
+import pygame
+from src.constants import *
+from src.game import Game
+from src.input import InputTracker, KEY_BITS, OTHER_KEY_BIT
+
+def post(event_type, key):
+    pygame.event.post(pygame.event.Event(event_type, key=key))
+
+def test_tap_between_ticks_is_held_for_one_tick():
+    tracker = InputTracker()
+    tracker.key_down(pygame.K_SPACE, 1)
+    tracker.key_up(pygame.K_SPACE, 2)
+    assert tracker.poll().mask == KEY_BITS[pygame.K_SPACE]
+    assert tracker.was_pressed(pygame.K_SPACE) and tracker.was_released(pygame.K_SPACE)
+    assert tracker.poll().mask == 0
+
+def test_untracked_keys_and_focus_loss():
+    tracker = InputTracker()
+    tracker.key_down(pygame.K_z, 1)
+    tracker.key_down(pygame.K_x, 2)
+    tracker.key_up(pygame.K_z, 3)
+    tracker.key_down(pygame.K_RIGHT, 4)
+    assert tracker.poll().mask == OTHER_KEY_BIT | KEY_BITS[pygame.K_RIGHT]
+    tracker.release_all(5)
+    assert tracker.poll().mask == 0
+
+def test_meta_keys_dont_reach_the_simulation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    game = Game(headless=True, seed=1)
+    game.start_room(0)
+    game.transition_to_next_room("next")
+    game.step(0)
+    for key in Game.META_KEYS:
+        post(pygame.KEYDOWN, key)
+        post(pygame.KEYUP, key)
+    pygame.event.pump()
+    game.handle_events()
+    game.tick()
+    assert game.last_keys.mask == 0
+    assert game.game_state == "TRANSITION"
+    post(pygame.KEYDOWN, pygame.K_z)
+    game.handle_events()
+    game.tick()
+    assert game.game_state == "PLAYING"
@@ -0,0 +1,64 @@
+import pygame
+import pytest
+from conftest import random_masks
+from src.game import Game
+from src.input import KEY_BITS, ScriptedInput
+from src.replay import Recorder, Replay, play
+
+def simulate(seed, room, masks):
+    game = Game(headless=True, seed=seed)
+    game.start_room(room)
+    snapshots = []
+    for mask in masks:
+        game.step(mask)
+        snapshots.append(game.room_manager.pack_sim_state())
+    return snapshots
+
+@pytest.mark.parametrize("room", range(7))
+def test_same_seed_and_keys_simulate_identically(room):
+    masks = random_masks(room, 900)
+    assert simulate(31, room, masks) == simulate(31, room, masks)
+
+def record(masks, start_room, pre_roll=0):
+    # Record a session the way a live game does: some ticks on the title
+    # screens first, then start_room() and the recording
+    game = Game(headless=True, input_source=ScriptedInput([0] * pre_roll + masks), seed=1234)
+    game.title_screen = pre_roll > 0
+    for _ in range(pre_roll):
+        game.tick()
+    recorder = Recorder(game.seed, start_room)
+    game.tick_hooks.append(recorder.record)
+    game.start_room(start_room)
+    while not game.input_source.finished():
+        game.tick()
+    return recorder.replay
+
+def test_replay_verifies(tmp_path):
+    replay = record(random_masks(7, 3000), 2)
+    path = tmp_path / "session.csreplay"
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert loaded.runs == replay.runs and loaded.hashes == replay.hashes
+    playback = play(loaded)
+    assert playback.divergence is None
+    assert playback.position == 3000
+
+def test_replay_verifies_after_pre_roll():
+    # Ticks spent before recording must not shift the checkpoints
+    replay = record(random_masks(8, 1500), 0, pre_roll=37)
+    assert play(replay).divergence is None
+
+def test_tampered_replay_diverges():
+    replay = record(random_masks(9, 3000), 2)
+    # Hold only right through a few runs in the middle
+    middle = len(replay.runs) // 2
+    for run in replay.runs[middle:middle + 5]:
+        run[0] = KEY_BITS[pygame.K_RIGHT] if run[0] != KEY_BITS[pygame.K_RIGHT] else 0
+    playback = play(replay)
+    assert playback.divergence is not None
+    index = playback.divergence // replay.hash_interval - 1
+    assert playback.expected_hash == replay.hashes[index]
+    assert playback.actual_hash != playback.expected_hash
+    # Reported at the first checkpoint after the tampering, not a later one
+    first_tampered = sum(ticks for mask, ticks in replay.runs[:middle])
+    assert first_tampered < playback.divergence <= first_tampered + replay.hash_interval
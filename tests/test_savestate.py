@@ -0,0 +1,84 @@
+import random
+import pytest
+from conftest import random_masks
+from src import savestate
+from src.game import Game
+
+@pytest.mark.parametrize("room", range(7))
+def test_savestate_round_trip(room):
+    masks = random_masks(room, 600)
+    game = Game(headless=True, seed=99 + room)
+    game.start_room(room)
+    for mask in masks[:300]:
+        game.step(mask)
+    data = savestate.dumps(game)
+    # Loaded into a game with another seed, it carries on identically
+    other = Game(headless=True, seed=5)
+    savestate.loads(other, data)
+    assert savestate.dumps(other) == data
+    for mask in masks[300:]:
+        game.step(mask)
+        other.step(mask)
+        assert other.room_manager.pack_sim_state() == game.room_manager.pack_sim_state()
+
+@pytest.mark.parametrize("room", [2, 6])
+def test_savestate_mid_transition_and_ending(room):
+    game = Game(headless=True, seed=7)
+    game.start_room(room)
+    game.transition_to_next_room("hello")
+    for _ in range(50):
+        game.step(0)
+    data = savestate.dumps(game)
+    other = Game(headless=True, seed=1)
+    savestate.loads(other, data)
+    assert other.game_state == game.game_state
+    assert (other.ending_sequence is None) == (game.ending_sequence is None)
+    for mask in [0, 256, 0] * 3 + [0] * 400:
+        game.step(mask)
+        other.step(mask)
+    assert savestate.dumps(other) == savestate.dumps(game)
+
+def test_corrupt_savestate_leaves_game_untouched():
+    source = Game(headless=True, seed=3)
+    source.start_room(6)
+    for mask in random_masks(1, 200):
+        source.step(mask)
+    data = savestate.dumps(source)
+    game = Game(headless=True, seed=4)
+    game.start_room(2)
+    for mask in random_masks(2, 100):
+        game.step(mask)
+    before = savestate.dumps(game)
+    rng = random.Random(0)
+    corrupted = [data[:cut] for cut in range(0, len(data), 97)]
+    for _ in range(200):
+        damaged = bytearray(data)
+        damaged[rng.randrange(6, len(data))] = rng.randrange(256)
+        corrupted.append(bytes(damaged))
+    for damaged in corrupted:
+        try:
+            savestate.loads(game, damaged)
+        except ValueError:
+            assert savestate.dumps(game) == before
+        else:
+            savestate.loads(game, before)
+
+def test_quick_save_to_unwritable_path_keeps_running(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("src.game.QUICKSAVE_PATH", str(tmp_path / "missing" / "quicksave.cssave"))
+    game = Game(headless=True, seed=1)
+    game.quick_save()
+    assert "Failed to save" in capsys.readouterr().out
+    game.step(0)
+
+def test_rooms_not_entered_yet_spawn_where_they_would_have():
+    # Loading lays out rooms the saving game hadn't entered, which must not
+    # move where the player appears when it gets there
+    game = Game(headless=True, seed=2)
+    game.start_room(0)
+    other = Game(headless=True, seed=3)
+    other.start_room(4)
+    savestate.loads(other, savestate.dumps(game))
+    for room in range(1, 7):
+        game.transition_to_next_room("")
+        other.transition_to_next_room("")
+        assert (other.player.x, other.player.y) == (game.player.x, game.player.y)
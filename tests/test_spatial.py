@@ -0,0 +1,19 @@
+import random
+import pygame
+from src.spatial import SpatialGrid
+
+def random_rect(rng):
+    return pygame.Rect(rng.randrange(-40, 820), rng.randrange(-40, 620), rng.randrange(1, 200), rng.randrange(1, 100))
+
+def test_spatial_grid_matches_brute_force():
+    rng = random.Random(1)
+    rects = [random_rect(rng) for _ in range(80)]
+    grid = SpatialGrid(rects)
+    handles = list(range(len(rects)))
+    for handle in rng.sample(handles, 20):
+        grid.remove(handle)
+        rects[handle] = None
+    live = [rect for rect in rects if rect is not None]
+    for _ in range(2000):
+        probe = random_rect(rng)
+        assert grid.colliding(probe) == [rect for rect in live if probe.colliderect(rect)]